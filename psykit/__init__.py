@@ -1,7 +1,7 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 from .stereomode import StereoWindow
-from .offscreen import OffscreenWindow, draw_texture
+from .offscreen import OffscreenWindow, draw_texture, draw_textures
 from .gltools import create_texture
 from .vpixx import reset_propixx, set_polarizer_mode
 import pyglet.gl as GL
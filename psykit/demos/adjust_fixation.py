@@ -47,10 +47,13 @@ for buffer in ['left', 'right']:
     aperture._reset() # Draw to the stencil buffer of each FBO (and hold it there)
 aperture.enabled = False
 stims = [gabor, image, rect, image2, dots, gabor2]
+nFrames = int(round(1/win.monitorFramePeriod)) # Frames per second
 try:
     radial = visual.RadialStim(win, tex='sqrXsqr', size=[5,5])
     stims.append(radial)
     has_radial = True
+    # Precompute a 4 Hz square wave contrast reversal for one second
+    contrastLUT = np.where((8*np.arange(nFrames)//nFrames) % 2 == 0, 1.0, -1.0)
 except (AttributeError, TypeError):
     has_radial = False
 try:
@@ -65,74 +68,79 @@ mode_label = visual.TextStim(win, text=modes[mode_idx], pos=[0,5], height=1,
     color='black', autoDraw=True)
 adjust_label = visual.TextStim(win, text=adjustments[adjust_idx], pos=[0,4], height=1, 
     color='orange', autoDraw=True)
+# Keyboard handlers
+def switch_mode(step):
+    global mode_idx
+    mode_idx = (mode_idx + step) % len(modes)
+    win.stereoMode = modes[mode_idx]
+    mode_label.text = modes[mode_idx]
+    adjust_label.autoDraw = (modes[mode_idx] in ['left/right', 'right/left'])
+
+def switch_stim(step):
+    global stim_idx
+    stim_idx = (stim_idx + step) % len(stims)
+    aperture.enabled = (stims[stim_idx] is gabor2) # Only update when the stimulus changes
+
+def adjust(step):
+    adjustment = adjustments[adjust_idx]
+    if adjustment == 'horizontal':
+        win._fixationOffset[0] += step
+        print(f"Fixation offset = {win.fixationOffset}")
+    elif adjustment == 'vertical':
+        win._fixationOffset[1] += step
+        print(f"Fixation offset = {win.fixationOffset}")
+    elif adjustment == 'vergence':
+        win._fixationVergence += step
+        print(f"Fixation vergence = {win.fixationVergence}")
+    elif adjustment == 'tilt':
+        win._fixationTilt += step
+        print(f"Fixation tilt = {win.fixationTilt}")
+
+def switch_adjustment():
+    global adjust_idx
+    adjust_idx = (adjust_idx + 1) % len(adjustments)
+    adjust_label.text = adjustments[adjust_idx]
+
+handlers = {
+    'space': lambda: switch_mode(+1),
+    'right': lambda: switch_mode(+1),
+    'left': lambda: switch_mode(-1),
+    'return': lambda: switch_stim(+1),
+    'down': lambda: switch_stim(+1),
+    'up': lambda: switch_stim(-1),
+    '1': lambda: adjust(-delta),
+    '2': lambda: adjust(+delta),
+    '3': switch_adjustment,
+}
 # Frame loop
 t = win.flip()
 while True:
-    # Draw left eye stimuli
+    # Draw left eye stimuli (log=False to skip logging every attribute change)
     win.setBuffer('left')
-    gabor.phase = 3*t
-    rect.ori = 180*t
-    gabor2.phase = 2*t
+    gabor.setPhase(3*t, log=False)
+    rect.setOri(180*t, log=False)
+    gabor2.setPhase(2*t, log=False)
     if has_radial:
-        radial.contrast = np.sign(np.sin(2*np.pi*4*t))
+        radial.setContrast(contrastLUT[int(t*nFrames) % nFrames], log=False)
     if has_noise:
         noise.buildNoise()
-    aperture.enabled = (stims[stim_idx]==gabor2)
     stims[stim_idx].draw()
     # Draw right eye stimuli
     win.setBuffer('right')
-    gabor.phase = 2*t
-    rect.ori = 90*t
-    gabor2.phase = 2*t + 0.1
+    gabor.setPhase(2*t, log=False)
+    rect.setOri(90*t, log=False)
+    gabor2.setPhase(2*t + 0.1, log=False)
     stims[stim_idx].draw()
     # Flip
     t = win.flip()
     pressedKeys = event.getKeys()
-    if 'escape' in pressedKeys:
-        break
-    elif 'space' in pressedKeys or 'right' in pressedKeys:
-        mode_idx = (mode_idx + 1) % len(modes)
-        win.stereoMode = modes[mode_idx]
-        mode_label.text = modes[mode_idx]
-        adjust_label.autoDraw = (modes[mode_idx] in ['left/right', 'right/left'])
-    elif 'left' in pressedKeys:
-        mode_idx = (mode_idx - 1) % len(modes)
-        win.stereoMode = modes[mode_idx]
-        mode_label.text = modes[mode_idx]
-        adjust_label.autoDraw = (modes[mode_idx] in ['left/right', 'right/left'])
-    elif 'return' in pressedKeys or 'down' in pressedKeys:
-        stim_idx = (stim_idx + 1) % len(stims)
-    elif 'up' in pressedKeys:
-        stim_idx = (stim_idx - 1) % len(stims)
-    elif '1' in pressedKeys:
-        if adjustments[adjust_idx] == 'horizontal':
-            win._fixationOffset[0] -= delta
-            print(f"Fixation offset = {win.fixationOffset}")
-        elif adjustments[adjust_idx] == 'vertical':
-            win._fixationOffset[1] -= delta
-            print(f"Fixation offset = {win.fixationOffset}")
-        elif adjustments[adjust_idx] == 'vergence':
-            win._fixationVergence -= delta
-            print(f"Fixation vergence = {win.fixationVergence}")
-        elif adjustments[adjust_idx] == 'tilt':
-            win._fixationTilt -= delta
-            print(f"Fixation tilt = {win.fixationTilt}")
-    elif '2' in pressedKeys:
-        if adjustments[adjust_idx] == 'horizontal':
-            win._fixationOffset[0] += delta
-            print(f"Fixation offset = {win.fixationOffset}")
-        elif adjustments[adjust_idx] == 'vertical':
-            win._fixationOffset[1] += delta
-            print(f"Fixation offset = {win.fixationOffset}")
-        elif adjustments[adjust_idx] == 'vergence':
-            win._fixationVergence += delta
-            print(f"Fixation vergence = {win.fixationVergence}")
-        elif adjustments[adjust_idx] == 'tilt':
-            win._fixationTilt += delta
-            print(f"Fixation tilt = {win.fixationTilt}")
-    elif '3' in pressedKeys:
-        adjust_idx = (adjust_idx + 1) % len(adjustments)
-        adjust_label.text = adjustments[adjust_idx]
+    if pressedKeys: # Nothing to do for most frames
+        if 'escape' in pressedKeys:
+            break
+        for key in handlers: # One action per frame, in the order of priority
+            if key in pressedKeys:
+                handlers[key]()
+                break
 # Clean up
 win.close()
 core.quit()
\ No newline at end of file
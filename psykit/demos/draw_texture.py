@@ -1,6 +1,6 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
-# An interesting demo ("antique viewer") for `create_texture` and `draw_texture`.
+# An interesting demo ("antique viewer") for `create_texture` and `draw_texture(s)`.
 # - Move mouse cursor to zoom and check image details (draw only part of the texture).
 # - Click left button to de-emphasize the background (change texture global alpha)
 # - Scroll to rotate the zoomed view (change texture rotation angle)
@@ -10,7 +10,7 @@
 # import sys, os.path as path
 # sys.path.insert(0, path.realpath(f"{path.dirname(__file__)}/../.."))
 from psychopy import visual, event, core
-from psykit import create_texture, draw_texture
+from psykit import create_texture, draw_textures
 from matplotlib.pyplot import imread
 
 
@@ -24,6 +24,7 @@ tex = create_texture(im)
 rotation = 0
 focusing = False
 mouse_hold = False
+last_pos = None
 while True:
     # Draw background texture
     if mouse.getPressed()[0]:
@@ -32,13 +33,17 @@ while True:
         mouse_hold = True
     else:
         mouse_hold = False
-    draw_texture(win, tex, alpha=(0.3 if focusing else 1))
+    background = dict(tex=tex, alpha=(0.3 if focusing else 1))
     # Draw foreground texture
     x, y = mouse.getPos()
     rotation += mouse.getWheelRel()[1]
-    src_rect = [(x+1)/2-0.05, (y+1)/2-0.05, (x+1)/2+0.05, (y+1)/2+0.05]
-    dst_rect = [x-0.2, y-0.2, x+0.2, y+0.2]
-    draw_texture(win, tex, src_rect, dst_rect, rotation)
+    if (x, y) != last_pos: # Only recompute the rects when the mouse has moved
+        src_rect = [(x+1)/2-0.05, (y+1)/2-0.05, (x+1)/2+0.05, (y+1)/2+0.05]
+        dst_rect = [x-0.2, y-0.2, x+0.2, y+0.2]
+        last_pos = (x, y)
+    foreground = dict(tex=tex, src_rect=src_rect, dst_rect=dst_rect, rotation=rotation)
+    # Draw both in one go (sharing the same GL state setup and texture binding)
+    draw_textures(win, [background, foreground])
     # Flip
     win.flip()
     if 'escape' in event.getKeys():
@@ -19,25 +19,28 @@ use_buffer = True # Try setting it to `False` and see what happens without using
 # Open a stereo window
 win = StereoWindow(monitor='testMonitor', units='deg', fullscr=False, 
     stereoMode='left/right', color='gray')
-win.recordFrameIntervals = True
 # Create an offscreen window for drawing
 buffer = OffscreenWindow(win)
-gabor = visual.GratingStim(win, tex='sin', mask='gauss', size=[5,5], sf=1)
-X, Y = np.meshgrid(np.linspace(-5,5,3), np.linspace(-5,5,3))
+# Many gabors in a 3x3 grid (drawn in a single call as an ElementArrayStim)
+xys = np.empty([9,2], dtype=np.float32) # Same element order as np.meshgrid
+xys[:,0] = np.tile(np.linspace(-5,5,3), 3)
+xys[:,1] = np.repeat(np.linspace(-5,5,3), 3)
+gabors = visual.ElementArrayStim(win, nElements=9, elementTex='sin', elementMask='gauss', 
+    sizes=5, xys=xys, sfs=1, oris=np.arange(0, 360, 40))
 t = win.flip()
-def draw_many_stims(gabor, t):
-    gabor.phase = 3*t
-    for x, y, ori in zip(X.flat, Y.flat, range(0, 360, 40)):
-        gabor.pos = [x, y]
-        gabor.ori = ori
-        gabor.draw()
+# Count dropped frames on the fly, instead of using `win.recordFrameIntervals`
+# which appends to a growing list every frame
+tStart, tPrev, nFlips, dropped = t, t, 0, 0
+def draw_many_stims(gabors, t):
+    gabors.setPhases(3*t, log=False)
+    gabors.draw()
 drawing_times = []
 while True:
     t0 = time.time()
     if use_buffer: # Draw many stimuli to the buffer once and use the result twice
         # Draw stimuli to the offscreen window
         buffer.bind() # Bind the offscreen window's framebuffer to redirect drawing
-        draw_many_stims(gabor, t)
+        draw_many_stims(gabors, t)
         buffer.unbind() # Explicit unbinding is actually not necessary in this case
         # Draw left eye stimuli
         win.setBuffer('left')
@@ -48,19 +51,22 @@ while True:
     else: # Draw many stimuli twice, which will take some extra time and may cause more frame drops
         # Draw left eye stimuli
         win.setBuffer('left')
-        draw_many_stims(gabor, t) # Draw many stimuli once
+        draw_many_stims(gabors, t) # Draw many stimuli once
         # Draw right eye stimuli
         win.setBuffer('right')
-        draw_many_stims(gabor, t) # Draw many stimuli again
+        draw_many_stims(gabors, t) # Draw many stimuli again
     drawing_times.append(time.time() - t0)
     # Flip
     t = win.flip()
+    nFlips += 1
+    if t - tPrev > 1.5*(t - tStart)/nFlips: # Longer than 1.5x the mean interval so far
+        dropped += 1
+    tPrev = t
     if 'escape' in event.getKeys():
         break
 # Print mean frame interval
-x = win.frameIntervals
-m = np.mean(x)
-print(f"mean interval: {m*1000:.3f} ms, dropped: {sum(x>1.5*np.median(x))}/{len(x)}, drawing time: {np.median(drawing_times)*1000:.3f} ms")
+m = (tPrev - tStart)/nFlips
+print(f"mean interval: {m*1000:.3f} ms, dropped: {dropped}/{nFlips}, drawing time: {np.median(drawing_times)*1000:.3f} ms")
 # Clean up
 win.close()
 core.quit()
@@ -10,13 +10,52 @@
 # Press `escape` to quit.
 import numpy as np
 from psychopy import visual, event, core
-import sys, os.path as path
+import sys, os, time, os.path as path
 sys.path.insert(0, path.realpath(f"{path.dirname(__file__)}/../.."))
 from psykit.stereomode import StereoWindow
+import pyglet.gl as GL
 from pypixxlib.propixx import PROPixx
-from pypixxlib import _libdpx
 
 
+# StereoWindow mode and ProPixx registers for each polariser mode
+polariser_modes = {
+    'none': dict(stereoMode='sequential', 
+        DlpSequencerProgram='RGB', VideoVesaBlueline=False, VesaFreeRun=False),
+    # Pros
+    # - Robust to frame drops
+    # - Allow binocuar 120 Hz frame rate
+    # Cons
+    # - Can only display achromatic stimuli (do not support color stimuli)
+    'RB3D': dict(stereoMode='red/blue-anticross', 
+        DlpSequencerProgram='RB3D', VideoVesaBlueline=False, VesaFreeRun=False),
+    # https://docs.vpixx.com/python/a-simple-hello-world-in-stereo
+    # Pros
+    # - Support color stimuli
+    # Cons
+    # - This mode is susceptible to frame drops
+    # - Only support binocuar 60 Hz frame rate
+    # Note that VesaFreeRun=False will auto set VidVesaWaveform=PPX_DEPTHQ and VidVesaPhase=0
+    'blueline': dict(stereoMode='sequential', 
+        DlpSequencerProgram='RGB', VideoVesaBlueline=True, VesaFreeRun=False),
+    # This is not really useable.
+    # The image in the two eyes will random swap from time to time due to 
+    # slow drift or frame drops.
+    'freerun': dict(stereoMode='sequential', 
+        DlpSequencerProgram='RGB', VideoVesaBlueline=False, VesaFreeRun=True),
+    # This is the recommended mode for most purposes.
+    # Use VPutil to adjust EDID to double-height mode [1920x2160 @ 60 Hz].
+    # You may need to adjust your screen resolution (dobule-height) to use this mode.
+    # Pros
+    # - Robust to frame drops
+    # - Support color stimuli
+    # Cons
+    # - Only support binocuar 60 Hz frame rate
+    'double-height': dict(stereoMode='top/bottom-anticross', 
+        DlpSequencerProgram='RGB', VideoVesaBlueline=False, VesaFreeRun=False),
+}
+# Last known values of the ProPixx registers, to skip writing unchanged ones
+pixx_registers = {}
+
 def reset_propixx(pixx):
     # Image orientation
     pixx.setRearProjectionMode(True) # Set the projector to read-projection mode (instant)
@@ -31,60 +70,18 @@ def reset_propixx(pixx):
     pixx.setVesaFreeRun(False) # Disable polariser switching (VESA port) in free run (non-sync) mode (cached)
     pixx.updateRegisterCache() # Update the new modes to the device (apply cached changes)
     # pixx.setCustomStartupConfig() # The projector will remember this configuration.
+    pixx_registers.update(DlpSequencerProgram='RGB', VideoVesaBlueline=False, VesaFreeRun=False)
     
 def set_polariser_mode(win, pixx, mode):
-    if mode == 'none':
-        win.stereoMode = 'sequential'
-        pixx.setDlpSequencerProgram('RGB')
-        pixx.setVideoVesaBlueline(False)
-        pixx.setVesaFreeRun(False)
-        pixx.updateRegisterCache()
-    elif mode == 'RB3D':
-        # Pros
-        # - Robust to frame drops
-        # - Allow binocuar 120 Hz frame rate
-        # Cons
-        # - Can only display achromatic stimuli (do not support color stimuli)
-        win.stereoMode = 'red/blue-anticross'
-        pixx.setDlpSequencerProgram('RB3D')
-        pixx.setVideoVesaBlueline(False)
-        pixx.setVesaFreeRun(False)
-        pixx.updateRegisterCache()
-    elif mode == 'blueline':
-        # https://docs.vpixx.com/python/a-simple-hello-world-in-stereo
-        # Pros
-        # - Support color stimuli
-        # Cons
-        # - This mode is susceptible to frame drops
-        # - Only support binocuar 60 Hz frame rate
-        win.stereoMode = 'sequential'
-        pixx.setDlpSequencerProgram('RGB')
-        pixx.setVideoVesaBlueline(True)
-        pixx.setVesaFreeRun(False) # This will auto set VidVesaWaveform=PPX_DEPTHQ and VidVesaPhase=0
-        pixx.updateRegisterCache()
-    elif mode == 'freerun':
-        # This is not really useable.
-        # The image in the two eyes will random swap from time to time due to 
-        # slow drift or frame drops.
-        win.stereoMode = 'sequential'
-        pixx.setDlpSequencerProgram('RGB')
-        pixx.setVideoVesaBlueline(False)
-        pixx.setVesaFreeRun(True)
-        pixx.updateRegisterCache()
-    elif mode == 'double-height':
-        # This is the recommended mode for most purposes.
-        # Use VPutil to adjust EDID to double-height mode [1920x2160 @ 60 Hz].
-        # You may need to adjust your screen resolution (dobule-height) to use this mode.
-        # Pros
-        # - Robust to frame drops
-        # - Support color stimuli
-        # Cons
-        # - Only support binocuar 60 Hz frame rate
-        win.stereoMode = 'top/bottom-anticross'
-        pixx.setDlpSequencerProgram('RGB')
-        pixx.setVideoVesaBlueline(False)
-        pixx.setVesaFreeRun(False)
+    cfg = dict(polariser_modes[mode])
+    win.stereoMode = cfg.pop('stereoMode')
+    # Only write registers that differ from the current state, and apply them at once
+    changed = {k: v for k, v in cfg.items() if pixx_registers.get(k) != v}
+    for register, value in changed.items():
+        getattr(pixx, f"set{register}")(value)
+    if changed:
         pixx.updateRegisterCache()
+        pixx_registers.update(changed)
         
 # Create ProPixx device
 pixx = PROPixx()
@@ -98,7 +95,9 @@ core.rush(True, realtime=True)
 win = StereoWindow(monitor='testMonitor', units='deg', fullscr=True, allowGUI=False, 
     stereoMode='none', crossTalk=[0,0], color='gray', screen=1)
 print(f"size = {win.size}, color = {win.color}, type={win.winType}")
-win.recordFrameIntervals = True
+# Record flip times in a preallocated ring buffer, instead of using 
+# `win.recordFrameIntervals` which appends to a growing list every frame
+flipTimes = np.zeros(100000) # About 28 min at 60 Hz
 # Stereo modes
 if win.size[1] > win.size[0]: # Double-height EDID
     modes = ['double-height']
@@ -111,60 +110,79 @@ else:
     ]
     mode_idx = 2
 set_polariser_mode(win, pixx, modes[mode_idx])
+tint_background = (modes[mode_idx] != 'RB3D') # Only updated when the mode changes
 # Define stimuli
-gabor = visual.GratingStim(win, tex='sin', mask='gauss', size=[5,5], sf=1)
+# Two gabors for each eye, drawn in a single call (without moving them around)
+gaborsLE = visual.ElementArrayStim(win, nElements=2, elementTex='sin', elementMask='gauss', 
+    sizes=5, sfs=1, xys=[[0,0], [-3,-3]])
+gaborsRE = visual.ElementArrayStim(win, nElements=2, elementTex='sin', elementMask='gauss', 
+    sizes=5, sfs=1, xys=[[0,0], [3,-3]])
 label = visual.TextStim(win, text=modes[mode_idx], pos=[0,5], height=1, 
     color='black', autoDraw=True)
-rect = visual.rect.Rect(win, units='norm', width=2, height=2)
+# Background is tinted by clearing each eye's buffer with a different color
+clearColor = (GL.GLfloat*4)()
+GL.glGetFloatv(GL.GL_COLOR_CLEAR_VALUE, clearColor) # Window color, to be restored
+# Per-eye drawing parameters: (buffer, background color (rgba1), gabors, phase speed)
+eyes = (('left', (1,0.5,0.5,1), gaborsLE, 3), ('right', (0.5,1,0.5,1), gaborsRE, 2))
+# Keyboard handlers
+def switch_mode(step):
+    global mode_idx, tint_background
+    mode_idx = (mode_idx + step) % len(modes)
+    set_polariser_mode(win, pixx, modes[mode_idx])
+    label.text = modes[mode_idx]
+    tint_background = (modes[mode_idx] != 'RB3D')
+
+def adjust_cross_talk(delta):
+    win.crossTalk = win.crossTalk + delta
+    print(win.crossTalk)
+
+def toggle_pause():
+    global paused
+    paused = not paused
+
+handlers = {
+    'space': lambda: switch_mode(+1),
+    'right': lambda: switch_mode(+1),
+    'left': lambda: switch_mode(-1),
+    'up': lambda: adjust_cross_talk(+0.01),
+    'down': lambda: adjust_cross_talk(-0.01),
+    'p': toggle_pause,
+}
 # Frame loop
 t = win.flip()
+flipTimes[0] = t
+nFlips = 1
+t0, tPrev, dropped = t, t, 0 # For counting dropped frames on the fly
 count = 0
 paused = False
 while count < np.inf:
     count += 1
-    # Draw left eye stimuli
-    win.setBuffer('left')
-    if modes[mode_idx] != 'RB3D':
-        rect.color = [1,0,0]
-        rect.draw()
-    if not paused:
-        gabor.phase = 3*t
-    gabor.pos = [0,0]
-    gabor.draw()
-    gabor.pos = [-3,-3]
-    gabor.draw()
-    # Draw right eye stimuli
-    win.setBuffer('right')
-    if modes[mode_idx] != 'RB3D':
-        rect.color = [0,1,0]
-        rect.draw()
-    if not paused:
-        gabor.phase = 2*t
-    gabor.pos = [0,0]
-    gabor.draw()
-    gabor.pos = [3,-3]
-    gabor.draw()
+    for buffer, color, gabors, speed in eyes:
+        # Draw stimuli for each eye
+        win.setBuffer(buffer, clear=not tint_background) # Avoid clearing twice
+        if tint_background:
+            GL.glClearColor(*color)
+            GL.glClear(GL.GL_COLOR_BUFFER_BIT)
+        if not paused:
+            gabors.setPhases(speed*t, log=False)
+        gabors.draw()
+    if tint_background:
+        GL.glClearColor(*clearColor)
     # Flip
     t = win.flip()
+    flipTimes[nFlips % len(flipTimes)] = t
+    nFlips += 1
+    if t - tPrev > 1.5*(t - t0)/(nFlips - 1): # Longer than 1.5x the mean interval so far
+        dropped += 1
+    tPrev = t
     pressedKeys = event.getKeys()
-    if 'escape' in pressedKeys:
-        break
-    elif 'space' in pressedKeys or 'right' in pressedKeys:
-        mode_idx = (mode_idx + 1) % len(modes)
-        set_polariser_mode(win, pixx, modes[mode_idx])
-        label.text = modes[mode_idx]
-    elif 'left' in pressedKeys:
-        mode_idx = (mode_idx - 1) % len(modes)
-        set_polariser_mode(win, pixx, modes[mode_idx])
-        label.text = modes[mode_idx]
-    elif 'up' in pressedKeys:
-        win.crossTalk = win.crossTalk + 0.01
-        print(win.crossTalk)
-    elif 'down' in pressedKeys:
-        win.crossTalk = win.crossTalk - 0.01
-        print(win.crossTalk)
-    elif 'p' in pressedKeys:
-        paused = not paused
+    if pressedKeys: # Nothing to do for most frames
+        if 'escape' in pressedKeys:
+            break
+        for key in handlers: # One action per frame, in the order of priority
+            if key in pressedKeys:
+                handlers[key]()
+                break
 # Restore ProPixx to default settings
 reset_propixx(pixx)
 pixx.close()
@@ -172,13 +190,18 @@ pixx.close()
 win.close()
 core.rush(False)
 
-import matplotlib.pyplot as plt
-x = win.frameIntervals
-m = np.mean(x)
-print(f"mean interval: {m*1000:.3f} ms, dropped: {sum(x>1.5*m)}/{len(x)}")
-plt.plot(x)
-if any(x>1.5*m):
-    plt.axhline(1.5*m, color='C3', ls='--')
-plt.show()
+x = np.diff(np.roll(flipTimes, -nFlips)[-min(nFlips, len(flipTimes)):]) # Oldest first
+m = (tPrev - t0)/(nFlips - 1)
+print(f"mean interval: {m*1000:.3f} ms, dropped: {dropped}/{nFlips - 1}")
+# Save frame intervals for offline analysis and plot them, only on demand
+# (e.g., `PSYKIT_SAVE=1 PSYKIT_PLOT=1 python propixx_polarizer.py`)
+if os.environ.get('PSYKIT_SAVE'):
+    np.save(f"frameIntervals_{time.strftime('%Y%m%d_%H%M%S')}.npy", x)
+if os.environ.get('PSYKIT_PLOT'):
+    import matplotlib.pyplot as plt
+    plt.plot(x)
+    if any(x>1.5*m):
+        plt.axhline(1.5*m, color='C3', ls='--')
+    plt.show()
 
 core.quit()
\ No newline at end of file
@@ -4,9 +4,9 @@
 # with the DepthQ polariser. Note we are not using StereoWindow in this example
 # in order to simplify the drawing procedure and minimize frame drops.
 # Press `escape` to quit.
+import os, time
 import numpy as np
 from psychopy import visual, event, core
-from pypixxlib.propixx import PROPixx
 
 
 def reset_propixx(pixx):
@@ -25,18 +25,25 @@ def reset_propixx(pixx):
     # pixx.setCustomStartupConfig() # The projector will remember this configuration.
 
 
-def main(with_propixx=False):        
+def main(with_propixx=False, n_frames=2500):
     # Create ProPixx device
     if with_propixx:
+        from pypixxlib.propixx import PROPixx # Only load the VPixx library if needed
         pixx = PROPixx()
         reset_propixx(pixx)
-    # This is a must for blue line sync mode
-    core.rush(True, realtime=True) 
+    # This is a must for blue line sync mode, but realtime priority may also 
+    # starve other threads (e.g., the graphics driver), so only rush if needed
+    if with_propixx:
+        core.rush(True, realtime=True) 
     # Open an ordinary window (rather than a StereoWindow)
+    # Keep waitBlanking=True: each eye's frame must land on its own refresh 
+    # for the blue line sync to work, so flips cannot be scheduled freely.
     win = visual.Window(monitor='testMonitor', units='deg', fullscr=True, allowGUI=False, 
         color='gray', waitBlanking=True, screen=1)
     print(f"size = {win.size}, color = {win.color}, type={win.winType}")
-    win.recordFrameIntervals = True
+    # Record flip times in a preallocated buffer (two flips per loop), instead 
+    # of `win.recordFrameIntervals` which appends to a list and logs warnings
+    flipTimes = np.zeros(2*n_frames+1)
     # Hide the cursor
     win.mouseVisible = False # win.setMouseVisible(False)
     # Stereo modes
@@ -51,28 +58,38 @@ def main(with_propixx=False):
         fillColor=None, colorSpace='rgb255', lineWidth=3)
     # Frame loop
     t = win.flip()
+    flipTimes[0] = t
+    t0, tPrev, dropped = t, t, 0 # For counting dropped frames on the fly
     count = 0
     paused = False
-    while count < 2500:
+    while count < n_frames:
         count += 1
-        # Draw left eye stimuli and then flip
+        # Draw left eye stimuli and then flip (log=False to skip logging every attribute change)
         if not paused:
-            gabor.phase = 3*t
-        gabor.pos = [0,0]
+            gabor.setPhase(3*t, log=False)
+        gabor.setPos([0,0], log=False)
         gabor.draw()
-        gabor.pos = [-3,-3]
+        gabor.setPos([-3,-3], log=False)
         gabor.draw()
         blueLine.draw()
         t = win.flip()
+        flipTimes[2*count-1] = t
+        if t - tPrev > 1.5*(t - t0)/(2*count-1): # Longer than 1.5x the mean interval so far
+            dropped += 1
+        tPrev = t
         # Draw right eye stimuli and then flip
         if not paused:
-            gabor.phase = 2*t
-        gabor.pos = [0,0]
+            gabor.setPhase(2*t, log=False)
+        gabor.setPos([0,0], log=False)
         gabor.draw()
-        gabor.pos = [3,-3]
+        gabor.setPos([3,-3], log=False)
         gabor.draw()
         blackLine.draw()
         t = win.flip()
+        flipTimes[2*count] = t
+        if t - tPrev > 1.5*(t - t0)/(2*count):
+            dropped += 1
+        tPrev = t
         pressedKeys = event.getKeys()
         if 'escape' in pressedKeys:
             break
@@ -88,14 +105,19 @@ def main(with_propixx=False):
     win.close()
     core.rush(False)
 
-    import matplotlib.pyplot as plt
-    x = win.frameIntervals
-    m = np.mean(x)
-    print(f"mean interval: {m*1000:.3f} ms, dropped: {sum(x>1.5*m)}/{len(x)}")
-    plt.plot(x)
-    if any(x>1.5*m):
-        plt.axhline(1.5*m, color='C3', ls='--')
-    plt.show()
+    x = np.diff(flipTimes[:2*count+1])
+    m = (tPrev - t0)/(2*count)
+    print(f"mean interval: {m*1000:.3f} ms, dropped: {dropped}/{2*count}")
+    # Save frame intervals for offline analysis and plot them, only on demand
+    # (e.g., `PSYKIT_SAVE=1 PSYKIT_PLOT=1 python propixx_polarizer_simple.py`)
+    if os.environ.get('PSYKIT_SAVE'):
+        np.save(f"frameIntervals_{time.strftime('%Y%m%d_%H%M%S')}.npy", x)
+    if os.environ.get('PSYKIT_PLOT'):
+        import matplotlib.pyplot as plt
+        plt.plot(x)
+        if any(x>1.5*m):
+            plt.axhline(1.5*m, color='C3', ls='--')
+        plt.show()
 
     core.quit()
 
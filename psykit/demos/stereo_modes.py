@@ -4,6 +4,7 @@
 # Press `space` (or `left`/`right`) to iterate through different stereo modes.
 # Press `up`/`down` to increase/decrease cross-talk compensation for both eyes.
 # Press `escape` to quit.
+import numpy as np
 from psychopy import visual, event, core
 import sys, os.path as path
 sys.path.insert(0, path.realpath(f"{path.dirname(__file__)}/../.."))
@@ -25,47 +26,55 @@ mode_idx = modes.index(win.stereoMode)
 gabor = visual.GratingStim(win, tex='sin', mask='gauss', size=[5,5], sf=1)
 label = visual.TextStim(win, text=modes[mode_idx], pos=[0,5], height=1, 
     color='black', autoDraw=True)
+# Per-eye drawing parameters: (buffer, position of the second gabor, phase speed)
+center = np.r_[0.0, 0.0]
+eyes = (('left', np.r_[-3.0, -3.0], 3), ('right', np.r_[3.0, -3.0], 2))
+# Keyboard handlers
+def switch_mode(step):
+    global mode_idx
+    mode_idx = (mode_idx + step) % len(modes)
+    win.stereoMode = modes[mode_idx]
+    label.text = modes[mode_idx]
+
+def adjust_cross_talk(delta):
+    win.crossTalk = win.crossTalk + delta
+    print(win.crossTalk)
+
+def toggle_pause():
+    global paused
+    paused = not paused
+
+handlers = {
+    'space': lambda: switch_mode(+1),
+    'right': lambda: switch_mode(+1),
+    'left': lambda: switch_mode(-1),
+    'up': lambda: adjust_cross_talk(+0.01),
+    'down': lambda: adjust_cross_talk(-0.01),
+    'p': toggle_pause,
+}
 # Frame loop
 t = win.flip()
 paused = False
 while True:
-    # Draw left eye stimuli
-    win.setBuffer('left')
-    if not paused:
-        gabor.phase = 3*t
-    gabor.pos = [0,0]
-    gabor.draw()
-    gabor.pos = [-3,-3]
-    gabor.draw()
-    # Draw right eye stimuli
-    win.setBuffer('right')
-    if not paused:
-        gabor.phase = 2*t
-    gabor.pos = [0,0]
-    gabor.draw()
-    gabor.pos = [3,-3]
-    gabor.draw()
+    for buffer, pos, speed in eyes:
+        # Draw stimuli for each eye (log=False to skip logging every attribute change)
+        win.setBuffer(buffer)
+        if not paused:
+            gabor.setPhase(speed*t, log=False)
+        gabor.setPos(center, log=False)
+        gabor.draw()
+        gabor.setPos(pos, log=False)
+        gabor.draw()
     # Flip
     t = win.flip()
     pressedKeys = event.getKeys()
-    if 'escape' in pressedKeys:
-        break
-    elif 'space' in pressedKeys or 'right' in pressedKeys:
-        mode_idx = (mode_idx + 1) % len(modes)
-        win.stereoMode = modes[mode_idx]
-        label.text = modes[mode_idx]
-    elif 'left' in pressedKeys:
-        mode_idx = (mode_idx - 1) % len(modes)
-        win.stereoMode = modes[mode_idx]
-        label.text = modes[mode_idx]
-    elif 'up' in pressedKeys:
-        win.crossTalk = win.crossTalk + 0.01
-        print(win.crossTalk)
-    elif 'down' in pressedKeys:
-        win.crossTalk = win.crossTalk - 0.01
-        print(win.crossTalk)
-    elif 'p' in pressedKeys:
-        paused = not paused
+    if pressedKeys: # Nothing to do for most frames
+        if 'escape' in pressedKeys:
+            break
+        for key in handlers: # One action per frame, in the order of priority
+            if key in pressedKeys:
+                handlers[key]()
+                break
 # Clean up
 win.close()
 core.quit()
\ No newline at end of file
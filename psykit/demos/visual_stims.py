@@ -33,11 +33,17 @@ image2 = visual.SimpleImageStim(win, image='jgscy.png', pos=[-1,0])
 dots = visual.DotStim(win, nDots=100, dotSize=5, fieldSize=[5,5], fieldShape='circle', 
     dir=0, coherence=0.5, dotLife=20, speed=2/60) # dotLife is important; speed in units/frame
 n = 6
-x, y = np.meshgrid(*[(np.arange(n)-(n-1)/2)*2]*2)
+xs = (np.arange(n)-(n-1)/2)*2
+xys = np.empty([n**2,2], dtype=np.float32) # Same element order as np.meshgrid
+xys[:,0] = np.tile(xs, n)
+xys[:,1] = np.repeat(xs, n)
 phases0 = np.linspace(0,1,n**2)
 elements = visual.ElementArrayStim(win, nElements=n**2, elementTex='sin', elementMask='gauss', 
-    sizes=3, xys=np.c_[x.flat, y.flat], sfs=1, phases=phases0, 
+    sizes=3, xys=xys, sfs=1, phases=phases0, 
     oris=np.linspace(0,360,n**2), contrs=np.linspace(0,1,n**2))
+# Precompute element phases (3 cycles/s) for one second, one row per frame
+nFrames = int(round(1/win.monitorFramePeriod))
+phasesLUT = 3*np.arange(nFrames)[:,np.newaxis]/nFrames + phases0
 gabor2 = visual.GratingStim(win, tex='sin', mask='gauss', size=[5,5], sf=0.5, ori=-30)
 aperture = visual.Aperture(win, size=5, shape='triangle')
 for buffer in ['left', 'right']:
@@ -49,6 +55,8 @@ try:
     radial = visual.RadialStim(win, tex='sqrXsqr', size=[5,5])
     stims.append(radial)
     has_radial = True
+    # Precompute a 4 Hz square wave contrast reversal for one second
+    contrastLUT = np.where((8*np.arange(nFrames)//nFrames) % 2 == 0, 1.0, -1.0)
 except (AttributeError, TypeError):
     has_radial = False
 try:
@@ -61,44 +69,56 @@ except (AttributeError, TypeError):
 stim_idx = 0
 label = visual.TextStim(win, text=modes[mode_idx], pos=[0,5], height=1, 
     color='black', autoDraw=True)
+# Keyboard handlers
+def switch_mode(step):
+    global mode_idx
+    mode_idx = (mode_idx + step) % len(modes)
+    win.stereoMode = modes[mode_idx]
+    label.text = modes[mode_idx]
+
+def switch_stim(step):
+    global stim_idx
+    stim_idx = (stim_idx + step) % len(stims)
+    aperture.enabled = (stims[stim_idx] is gabor2) # Only update when the stimulus changes
+
+handlers = {
+    'space': lambda: switch_mode(+1),
+    'right': lambda: switch_mode(+1),
+    'left': lambda: switch_mode(-1),
+    'return': lambda: switch_stim(+1),
+    'down': lambda: switch_stim(+1),
+    'up': lambda: switch_stim(-1),
+}
 # Frame loop
 t = win.flip()
 while True:
-    # Draw left eye stimuli
+    # Draw left eye stimuli (log=False to skip logging every attribute change)
     win.setBuffer('left')
-    gabor.phase = 3*t
-    rect.ori = 180*t
-    elements.phases = 3*t + phases0
-    gabor2.phase = 2*t
+    gabor.setPhase(3*t, log=False)
+    rect.setOri(180*t, log=False)
+    elements.setPhases(phasesLUT[int(t*nFrames) % nFrames], log=False)
+    gabor2.setPhase(2*t, log=False)
     if has_radial:
-        radial.contrast = np.sign(np.sin(2*np.pi*4*t))
+        radial.setContrast(contrastLUT[int(t*nFrames) % nFrames], log=False)
     if has_noise:
         noise.buildNoise()
-    aperture.enabled = (stims[stim_idx]==gabor2)
     stims[stim_idx].draw()
     # Draw right eye stimuli
     win.setBuffer('right')
-    gabor.phase = 2*t
-    rect.ori = 90*t
-    gabor2.phase = 2*t + 0.1
+    gabor.setPhase(2*t, log=False)
+    rect.setOri(90*t, log=False)
+    gabor2.setPhase(2*t + 0.1, log=False)
     stims[stim_idx].draw()
     # Flip
     t = win.flip()
     pressedKeys = event.getKeys()
-    if 'escape' in pressedKeys:
-        break
-    elif 'space' in pressedKeys or 'right' in pressedKeys:
-        mode_idx = (mode_idx + 1) % len(modes)
-        win.stereoMode = modes[mode_idx]
-        label.text = modes[mode_idx]
-    elif 'left' in pressedKeys:
-        mode_idx = (mode_idx - 1) % len(modes)
-        win.stereoMode = modes[mode_idx]
-        label.text = modes[mode_idx]
-    elif 'return' in pressedKeys or 'down' in pressedKeys:
-        stim_idx = (stim_idx + 1) % len(stims)
-    elif 'up' in pressedKeys:
-        stim_idx = (stim_idx - 1) % len(stims)
+    if pressedKeys: # Nothing to do for most frames
+        if 'escape' in pressedKeys:
+            break
+        for key in handlers: # One action per frame, in the order of priority
+            if key in pressedKeys:
+                handlers[key]()
+                break
 # Clean up
 win.close()
 core.quit()
\ No newline at end of file
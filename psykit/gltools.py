@@ -9,9 +9,12 @@
 # For a more full-fledged and modern wrapper for OpenGL, see e.g., ModernGL.
 # 2024-05-10: created by qcc
 from pyglet.gl import *
+import pyglet
 import numpy as np
 import ctypes
 import platform
+import math
+import weakref
 
 
 # ========== Compatibility issues ==========
@@ -25,10 +28,10 @@ def str_to_lp_lp_c_char(s, encoding='utf-8'):
     '''
     Cast Python str to C char** (pointer to char* or char[]), i.e., lp_lp_c_char.
     '''
-    # Convert the string to a ctypes char pointer
-    c_char_p_string = ctypes.c_char_p(s.encode(encoding))
-    # Create a pointer to the char* (NUL terminated) and cast it to char**
-    lp_lp_c_char = ctypes.cast(ctypes.pointer(c_char_p_string), ctypes.POINTER(ctypes.POINTER(ctypes.c_char)))
+    # Store the string as the only element of a char* array (NUL terminated)
+    c_char_p_array = (ctypes.c_char_p*1)(s.encode(encoding))
+    # Cast the array to char** (the cast result keeps the array alive)
+    lp_lp_c_char = ctypes.cast(c_char_p_array, ctypes.POINTER(ctypes.POINTER(ctypes.c_char)))
     return lp_lp_c_char
 
 
@@ -40,33 +43,33 @@ def normalize(v):
     return v / np.linalg.norm(v)
 
 
+def _normalize3(v):
+    '''
+    Faster `normalize` for 3-vectors, avoiding the overhead of np.linalg.norm.
+    '''
+    x, y, z = v
+    return np.asarray(v) / math.sqrt(x*x + y*y + z*z)
+
+
 def scaling(sxyz=[1,1,1]):
     '''
     Create a 4x4 3D scaling matrix.
     '''
-    sx, sy, sz = sxyz
-    return np.array([
-        [sx, 0,  0,  0],
-        [0,  sy, 0,  0],
-        [0,  0,  sz, 0],
-        [0,  0,  0,  1],
-    ])
+    M = np.eye(4, dtype=np.float32)
+    M[0,0], M[1,1], M[2,2] = sxyz
+    return M
 
 
 def translation(txyz=[0,0,0]):
     '''
     Create a 4x4 3D translation matrix.
     '''
-    tx, ty, tz = txyz
-    return np.array([
-        [1, 0, 0, tx],
-        [0, 1, 0, ty],
-        [0, 0, 1, tz],
-        [0, 0, 0, 1],
-    ])
+    M = np.eye(4, dtype=np.float32)
+    M[0,3], M[1,3], M[2,3] = txyz
+    return M
 
 
-def rotation(angle=0, axis=[0,0,1]):
+def rotation(angle=0, axis=[0,0,1], center=None):
     '''
     Create a 4x4 3D rotation matrix that rotate `angle` along `axis`.
 
@@ -75,15 +78,23 @@ def rotation(angle=0, axis=[0,0,1]):
     angle : float
         Amount of rotation in radian
     axis : array of shape (3,)
-    '''
-    c, s = np.cos(angle), np.sin(angle)
-    u, v, w = axis/np.linalg.norm(axis)
-    return np.array([
-        [c + u*u*(1-c),    u*v*(1-c) - w*s,  u*w*(1-c) + v*s, 0],
-        [v*u*(1-c) + w*s,  c + v*v*(1-c),    v*w*(1-c) - u*s, 0],
-        [w*u*(1-c) - v*s,  w*v*(1-c) + u*s,  c + w*w*(1-c),   0],
-        [0,                0,                0,               1],
-    ])
+    center : array of shape (3,)
+        If provided, rotate about this point instead of the origin. This is 
+        equivalent to `translation(center) @ rotation(angle, axis) @ translation(-center)`
+        but without the two 4x4 matrix multiplications.
+    '''
+    c, s = math.cos(angle), math.sin(angle)
+    u, v, w = _normalize3(axis)
+    C = 1 - c
+    uv, uw, vw = u*v*C, u*w*C, v*w*C
+    M = np.eye(4, dtype=np.float32)
+    M[0,0], M[0,1], M[0,2] = c + u*u*C, uv - w*s,   uw + v*s
+    M[1,0], M[1,1], M[1,2] = uv + w*s,   c + v*v*C, vw - u*s
+    M[2,0], M[2,1], M[2,2] = uw - v*s,   vw + u*s,  c + w*w*C
+    if center is not None:
+        center = np.asarray(center, dtype=np.float32)
+        M[:3,3] = center - M[:3,:3] @ center
+    return M
 
 
 def perspective(fov, aspect, near=0.1, far=100):
@@ -112,12 +123,13 @@ def perspective(fov, aspect, near=0.1, far=100):
     tangent = np.tan(fov/2.0) # Tangent of half fovY
     top = near * tangent #  Half height of near plane
     right = top * aspect # Half width of near plane
-    return np.array([
-        [near/right, 0.0, 0.0, 0.0],
-        [0.0, near/top, 0.0, 0.0],
-        [0.0, 0.0, -(far+near)/(far-near), -(2*far*near)/(far-near)],
-        [0.0, 0.0, -1, 0.0],
-    ])
+    M = np.zeros((4,4), dtype=np.float32)
+    M[0,0] = near/right
+    M[1,1] = near/top
+    M[2,2] = -(far+near)/(far-near)
+    M[2,3] = -(2*far*near)/(far-near)
+    M[3,2] = -1
+    return M
 
 
 def look_at(position, target=[0,0,0], up=[0,1,0]):
@@ -129,17 +141,66 @@ def look_at(position, target=[0,0,0], up=[0,1,0]):
     ----------
     https://learnopengl.com/Getting-started/Camera
     '''
-    position = np.asarray(position)
-    camera_z = normalize(position - target) # Camera direction (pointing towards the back of the camera)
-    camera_x = normalize(np.cross(up, camera_z)) # Camera right
+    position = np.asarray(position, dtype=np.float32)
+    camera_z = _normalize3(position - target) # Camera direction (pointing towards the back of the camera)
+    camera_x = _normalize3(np.cross(up, camera_z)) # Camera right
     camera_y = np.cross(camera_z, camera_x) # Camera up
-    rot = np.c_[np.vstack([camera_x, camera_y, camera_z, np.zeros(3)]), [0,0,0,1]]
-    trans = np.c_[np.vstack([np.eye(3), np.zeros(3)]), np.r_[-position,1]]
-    return rot @ trans
+    # Fill the final view matrix (rotation @ translation) directly
+    V = np.eye(4, dtype=np.float32)
+    V[0,:3], V[1,:3], V[2,:3] = camera_x, camera_y, camera_z
+    V[:3,3] = -(V[:3,:3] @ position)
+    return V
+
+
+def batch_look_at(positions, targets=[0,0,0], ups=[0,1,0]):
+    '''
+    Vectorized `look_at` for a whole camera trajectory, e.g., to precompute the
+    view matrices of an animation before the frame loop.
+
+    Parameters
+    ----------
+    positions : array of shape (n,3)
+        Camera position for each of the n frames.
+    targets : array of shape (n,3) or (3,)
+        Target for each frame, or the same target for all frames.
+    ups : array of shape (n,3) or (3,)
+        Up direction for each frame, or the same up direction for all frames.
+
+    Returns
+    -------
+    V : array of shape (n,4,4)
+        View matrices, V[k] equals `look_at(positions[k], targets[k], ups[k])`.
+    '''
+    positions = np.asarray(positions, dtype=np.float32).reshape(-1,3)
+    camera_z = positions - np.asarray(targets, dtype=np.float32)
+    camera_z /= np.linalg.norm(camera_z, axis=-1, keepdims=True)
+    camera_x = np.cross(np.asarray(ups, dtype=np.float32), camera_z)
+    camera_x /= np.linalg.norm(camera_x, axis=-1, keepdims=True)
+    camera_y = np.cross(camera_z, camera_x)
+    V = np.zeros((len(positions),4,4), dtype=np.float32)
+    V[:,0,:3], V[:,1,:3], V[:,2,:3] = camera_x, camera_y, camera_z
+    V[:,:3,3] = -np.einsum('nij,nj->ni', V[:,:3,:3], positions)
+    V[:,3,3] = 1
+    return V
 
 
 # ========== Shaders ==========
-def compile_shader_program(vertex_source, fragment_source):
+# Cache of linked shader programs: {object space: {(vertex_source, fragment_source, attributes): program}}
+# GL object names are only meaningful within the object space (shared by all 
+# contexts sharing objects) they were created in, and pyglet drops the object 
+# space once its last context is gone.
+_programs = weakref.WeakKeyDictionary()
+
+
+def _object_space():
+    '''
+    Get the GL object space of the current context (or None if no context).
+    '''
+    context = pyglet.gl.current_context
+    return None if context is None else context.object_space
+
+
+def compile_shader_program(vertex_source, fragment_source, attributes=None, cache=True):
     '''
     Compile vertex and fragment shaders and link them for later use.
 
@@ -149,12 +210,31 @@ def compile_shader_program(vertex_source, fragment_source):
         Source code for the vertex shader.
     fragment_source : str
         Source code for the fragment shader.
+    attributes : list of bytes
+        Names of the vertex attributes in the vertex shader, which will be 
+        bound to location 0, 1, 2, ... in order before linkage (to match the 
+        attribute order in `create_vertex_array`), e.g., [b"aPos", b"aTexCoords"].
+        If None, the locations are left to the linker.
+    cache : bool
+        If True, return the previously linked program for identical sources 
+        in the same GL object space (i.e., the current context and contexts 
+        sharing objects with it), skipping compilation altogether, so the same 
+        program can be shared by many stimuli. Such a shared program should 
+        not be deleted.
+        Per-stimulus variations (e.g., transform, alpha) are meant to be set 
+        via uniforms (see `set_uniform`) right before each draw, rather than by
+        compiling another program; and uniform values set once will be seen 
+        by all users of the shared program.
 
     Related functions
     -----------------
     Consider using `moderngl.Program` which is more Pythonic and provides code inspection.
     `psychopy.visual.shaders.compileProgram` is similar to what we have here.
     '''
+    key = (vertex_source, fragment_source, None if attributes is None else tuple(attributes))
+    space = _object_space() if cache else None
+    if space is not None and key in _programs.get(space, {}):
+        return _programs[space][key]
     # Compile vertex shader
     vertexShader = glCreateShader(GL_VERTEX_SHADER)
     # glShaderSource(vertexShader, 1, str_to_lp_lp_c_char(vertex_source), None) # "1" is the number of strings in the char**
@@ -168,16 +248,33 @@ def compile_shader_program(vertex_source, fragment_source):
     check_shader_status(fragmentShader, label='Fragment')
     # Link shader program
     shaderProgram = glCreateProgram()
+    _forget_uniform_locations(shaderProgram) # The name may have belonged to a deleted program
     glAttachShader(shaderProgram, vertexShader)
     glAttachShader(shaderProgram, fragmentShader)
+    if attributes is not None:
+        for k, name in enumerate(attributes):
+            glBindAttribLocation(shaderProgram, k, name)
     glLinkProgram(shaderProgram)
     check_shader_status(shaderProgram, stage='link')
     # Delete no longer used shader compilation intermediate objects
     glDeleteShader(vertexShader)
     glDeleteShader(fragmentShader)
+    if space is not None:
+        _programs.setdefault(space, {})[key] = shaderProgram
     return shaderProgram
 
 
+def delete_shader_program(program):
+    '''
+    Delete a shader program (e.g., compiled with `cache=False`).
+    Use this rather than `glDeleteProgram`, so that cached uniform locations 
+    of the program are forgotten before GL reuses its name.
+    Programs returned from the cache (`cache=True`) should not be deleted.
+    '''
+    _forget_uniform_locations(program)
+    glDeleteProgram(program)
+
+
 def check_shader_status(shader, stage='compile', raise_error=True, 
     max_message_len=512, label=None):
     '''
@@ -190,6 +287,9 @@ def check_shader_status(shader, stage='compile', raise_error=True,
     stage : str
         - 'compile'
         - 'link'
+    max_message_len : int
+        Size of the message buffer if the driver does not report the length 
+        of the info log.
     '''
     success = GLint()
     if stage == 'compile':
@@ -197,6 +297,14 @@ def check_shader_status(shader, stage='compile', raise_error=True,
     elif stage == 'link':
         glGetProgramiv(shader, GL_LINK_STATUS, success)
     if not success:
+        # Allocate just enough for the whole info log (only on failure)
+        log_len = GLint()
+        if stage == 'compile':
+            glGetShaderiv(shader, GL_INFO_LOG_LENGTH, log_len)
+        elif stage == 'link':
+            glGetProgramiv(shader, GL_INFO_LOG_LENGTH, log_len)
+        if log_len.value > 0:
+            max_message_len = log_len.value
         infoLog = (ctypes.c_char*max_message_len)()
         if stage == 'compile':
             glGetShaderInfoLog(shader, max_message_len, None, infoLog)
@@ -211,13 +319,64 @@ def check_shader_status(shader, stage='compile', raise_error=True,
 
 
 # ========== Uniforms ==========
+# Cache of uniform locations: {object space: {program: {name: location}}}
+# Entries of a program are dropped when the program is deleted (see 
+# `delete_shader_program`) or its name is handed out again by glCreateProgram.
+_uniform_locations = weakref.WeakKeyDictionary()
+
+
+def get_uniform_location(program, name):
+    '''
+    Get (and cache) the location of a uniform variable in the shader program.
+    Uniform locations do not change after linkage, so we only need to query 
+    the driver once for each (program, name) pair.
+
+    Parameters
+    ----------
+    program : 
+        Shader program.
+    name : bytes
+        Name of the uniform variable in the shader.
+    '''
+    space = _object_space()
+    if space is None:
+        return glGetUniformLocation(program, name)
+    locations = _uniform_locations.setdefault(space, {}).setdefault(getattr(program, 'value', program), {})
+    loc = locations.get(name)
+    if loc is None:
+        loc = locations[name] = glGetUniformLocation(program, name)
+    return loc
+
+
+def _forget_uniform_locations(program):
+    '''
+    Forget the cached uniform locations of a program in the current object space.
+    '''
+    space = _object_space()
+    if space is not None and space in _uniform_locations:
+        _uniform_locations[space].pop(getattr(program, 'value', program), None)
+
+
+# Uniform setters for float ndarray values keyed by shape: (function, is_matrix)
+_uniform_setters = {
+    (4,4): (glUniformMatrix4fv, True),
+    (3,3): (glUniformMatrix3fv, True),
+    (2,2): (glUniformMatrix2fv, True),
+    (4,): (glUniform4fv, False),
+    (3,): (glUniform3fv, False),
+    (2,): (glUniform2fv, False),
+    (1,): (glUniform1fv, False),
+}
+
+
 def set_uniform(program, name, value):
     '''
     Set uniform value for shader programs.
 
     Appropriate OpenGL function will be called according to the type, dtype, and
     shape of the ``value``, e.g., a transformation should be a 4x4 float ndarray.
-    Currently, only support 4x4 matrix with float values, e.g., transformations.
+    Currently, support float ndarray of shape (4,4), (3,3), (2,2) (i.e., mat4, 
+    mat3, mat2) and (4,), (3,), (2,), (1,) (i.e., vec4, vec3, vec2, float).
 
     Parameters
     ----------
@@ -229,13 +388,38 @@ def set_uniform(program, name, value):
     value : 
         New value for the uniform variable.
     '''
-    loc = glGetUniformLocation(program, name)
+    loc = get_uniform_location(program, name)
     if isinstance(value, np.ndarray):
-        if value.shape == (4,4):
-            if value.dtype.kind == 'f':  
+        if value.dtype.kind == 'f' and value.shape in _uniform_setters:
+            func, is_matrix = _uniform_setters[value.shape]
+            if is_matrix:
                 # (uniform's location, how many matrices to send, transpose (default=GL_FALSE is F order), pointer to matrix values)
-                data = (GLfloat*value.size)(*value.flat)
-                glUniformMatrix4fv(loc, 1, GL_TRUE, data)
+                # Lay out the matrix in column-major (F order) as OpenGL expects, so the driver need not transpose it
+                data = np.asfortranarray(value, dtype=np.float32)
+                func(loc, 1, GL_FALSE, data.ctypes.data_as(ctypes.POINTER(GLfloat)))
+            else:
+                # (uniform's location, how many vectors to send, pointer to vector values)
+                data = np.ascontiguousarray(value, dtype=np.float32)
+                func(loc, 1, data.ctypes.data_as(ctypes.POINTER(GLfloat)))
+
+
+def set_uniforms(program, uniforms):
+    '''
+    Set multiple uniform values (e.g., model, view, and projection matrices) 
+    for a shader program in one call.
+
+    Parameters
+    ----------
+    program : 
+        Shader program for which the uniform values will be set.
+    uniforms : dict
+        {name: value} pairs, where name is bytes (or str) and value is as in
+        `set_uniform`, e.g., {b"view": V, b"projection": P}.
+    '''
+    for name, value in uniforms.items():
+        if isinstance(name, str):
+            name = name.encode('utf-8')
+        set_uniform(program, name, value)
 
 
 # ========== Vertex buffer object (VBO) ==========
@@ -262,16 +446,45 @@ def create_vertex_buffer(vertices, usage=GL_STATIC_DRAW, bind=False):
     glGenBuffers(1, vbo)  # Generate one new VBO
     glBindBuffer(GL_ARRAY_BUFFER, vbo)  # Bind the VBO
     # Copy the vertex data into the VBO
-    vertices = np.ravel(vertices)
-    vertex_data = (GLfloat*len(vertices))(*vertices)
-    glBufferData(GL_ARRAY_BUFFER, ctypes.sizeof(vertex_data), vertex_data, usage)
+    # Pass the contiguous float32 buffer directly (without unpacking into a ctypes array)
+    vertices = np.ascontiguousarray(np.ravel(vertices), dtype=np.float32)
+    glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices.ctypes.data_as(ctypes.POINTER(GLfloat)), usage)
     # Unbind the VBO
     if not bind:
         glBindBuffer(GL_ARRAY_BUFFER, 0)
     return vbo
 
 
-def create_element_buffer(indices, usage=GL_STATIC_DRAW, bind=False):
+def update_vertex_buffer(vbo, vertices, offset=0, bind=False):
+    '''
+    Update (part of) the vertex data in an existing VBO in place.
+
+    Unlike recreating the buffer with `glBufferData`, this does not reallocate
+    the storage on the GPU, which makes it the preferred way to change vertex 
+    data every frame (create the VBO once with GL_DYNAMIC_DRAW).
+
+    Parameters
+    ----------
+    vbo : ctypes.c_uint
+        VBO id as returned by `create_vertex_buffer`.
+    vertices : array of shape (n,k) or (k*n,)
+        New float vertex data. Must fit into the buffer after `offset`.
+    offset : int
+        Offset (in number of float values) into the buffer to start writing.
+    bind : bool
+        Whether to remain binding to GL_ARRAY_BUFFER after updating.
+    '''
+    glBindBuffer(GL_ARRAY_BUFFER, vbo)
+    vertices = np.ascontiguousarray(np.ravel(vertices), dtype=np.float32)
+    # (target, offset in bytes, size in bytes, data)
+    glBufferSubData(GL_ARRAY_BUFFER, offset*ctypes.sizeof(GLfloat), vertices.nbytes, 
+        vertices.ctypes.data_as(ctypes.POINTER(GLfloat)))
+    if not bind:
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+    return vbo
+
+
+def create_element_buffer(indices, usage=GL_STATIC_DRAW, bind=False, dtype=np.uint32):
     '''
     Create a element buffer object (EBO) for storing vertex indices on the GPU.
     Index starts from zero.
@@ -286,6 +499,10 @@ def create_element_buffer(indices, usage=GL_STATIC_DRAW, bind=False):
         - GL_DYNAMIC_DRAW: the data is changed a lot and used many times.
     bind : bool
         Whether to remain binding to GL_ELEMENT_ARRAY_BUFFER after creation.
+    dtype : np.uint32 | np.uint16 | np.uint8
+        Storage type of the indices, which must match the type passed to 
+        `glDrawElements` (GL_UNSIGNED_INT, GL_UNSIGNED_SHORT, GL_UNSIGNED_BYTE).
+        Smaller types save memory and bandwidth for small meshes.
     '''
     # Create a EBO and bind it to GL_ELEMENT_ARRAY_BUFFER
     ebo = GLuint()  # Placeholder for the EBO
@@ -293,9 +510,9 @@ def create_element_buffer(indices, usage=GL_STATIC_DRAW, bind=False):
     glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, ebo)  # Bind the EBO
     # Copy the index data into the EBO
     indices = np.ravel(indices)
-    assert (indices.dtype.kind == 'i')  # np.issubdtype(dtype, np.integer)
-    index_data = (GLuint*len(indices))(*indices)
-    glBufferData(GL_ELEMENT_ARRAY_BUFFER, ctypes.sizeof(index_data), index_data, usage)
+    assert (indices.dtype.kind in ['i', 'u'])  # np.issubdtype(dtype, np.integer)
+    indices = np.ascontiguousarray(indices, dtype=dtype)
+    glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices.ctypes.data_as(ctypes.c_void_p), usage)
     # Unbind the EBO
     if not bind:
         glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
@@ -304,7 +521,7 @@ def create_element_buffer(indices, usage=GL_STATIC_DRAW, bind=False):
 
 # ========== Vertex array object (VAO) ==========
 def create_vertex_array(vertices, attributes, indices=None, usage=GL_STATIC_DRAW, 
-    indices_usage=None, bind=False):
+    indices_usage=None, indices_dtype=np.uint32, bind=False, return_buffers=False):
     '''
     Create a vertex array object (VAO) to store (subsequent) vertex attribute calls 
     for fast switching between different vertex data and attribute configurations
@@ -325,20 +542,28 @@ def create_vertex_array(vertices, attributes, indices=None, usage=GL_STATIC_DRAW
         - GL_STREAM_DRAW: the data is set only once and used by the GPU at most a few times.
         - GL_STATIC_DRAW: the data is set only once and used many times.
         - GL_DYNAMIC_DRAW: the data is changed a lot and used many times.
+    indices_usage : int
+        Usage of the indices. If None, the same as `usage`.
+    indices_dtype : np.uint32 | np.uint16 | np.uint8
+        Storage type of the indices (see `create_element_buffer`).
     bind : bool
         Whether to remain binding to GL_ARRAY_BUFFER after creation.
+    return_buffers : bool
+        Whether to also return the VBO and EBO (None if `indices` is None), e.g.,
+        for updating the vertex data later with `update_vertex_buffer`.
     '''
     # Create a Vertex Array Object (VAO)
     vao = GLuint() # Placeholder for the VAO
     glGenVertexArrays(1, vao) # Generate one new VAO
     glBindVertexArray(vao) # Bind the VAO
     # Create a VBO and bind it to GL_ARRAY_BUFFER
-    create_vertex_buffer(vertices, usage=usage, bind=True)
+    vbo = create_vertex_buffer(vertices, usage=usage, bind=True)
     # Create a EBO and bind it to GL_ELEMENT_ARRAY_BUFFER
+    ebo = None
     if indices is not None:
         if indices_usage is None:
             indices_usage = usage
-        create_element_buffer(indices, usage=indices_usage, bind=True)
+        ebo = create_element_buffer(indices, usage=indices_usage, bind=True, dtype=indices_dtype)
     # Set the vertex attributes pointers
     for k, (attribute, (stride, offset)) in enumerate(zip(attributes, compute_stride_offset(attributes))):
         name, size, need_norm = attribute
@@ -355,6 +580,8 @@ def create_vertex_array(vertices, attributes, indices=None, usage=GL_STATIC_DRAW
     glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0) # Fixed bug: 2024-05-15 by qcc
     if bind:
         glBindVertexArray(vao) # Bind this VAO
+    if return_buffers:
+        return vao, vbo, ebo
     return vao
 
 
@@ -379,15 +606,22 @@ def compute_stride_offset(attributes):
     -------
     results : list of (stride, offset)
     '''
-    sizes = [attribute[1] for attribute in attributes]
-    stride = sum(sizes)
-    offsets = np.cumsum(np.r_[0, sizes])[:len(sizes)]
-    return [(stride, int(offset)) for offset in offsets]
+    stride = sum(attribute[1] for attribute in attributes)
+    results = []
+    offset = 0
+    for attribute in attributes:
+        results.append((stride, offset))
+        offset += attribute[1]
+    return results
 
 
 # ========== Textures ==========
+_texture_units = [GL_TEXTURE0 + k for k in range(16)] # GL_TEXTURE0 to GL_TEXTURE15 are consecutive
+
+
 def create_texture(data, size=None, unit=0, warp=GL_REPEAT, 
-    min_filter=None, mag_filter=GL_LINEAR, mipmap=True, bind=False):
+    min_filter=None, mag_filter=GL_LINEAR, mipmap=True, bind=False, flipud=True, 
+    validate=False):
     '''
     Create a 2D texture.
 
@@ -415,6 +649,14 @@ def create_texture(data, size=None, unit=0, warp=GL_REPEAT,
         Whether to enable mipmap (for efficient and high quality downscaling).
     bind : bool
         Whether to remain binding to GL_TEXTURE_2D after creation.
+    flipud : bool
+        Whether to flip the data upside down, because array origin is at upper 
+        left (as for images) but texture origin is at lower left. 
+        Pass False if the data is already bottom-up (e.g., read back from OpenGL) 
+        to save a full copy of the data.
+    validate : bool
+        Whether to check that float data are within range (an extra full pass
+        over the data, so it is off by default).
 
     Returns
     -------
@@ -424,7 +666,7 @@ def create_texture(data, size=None, unit=0, warp=GL_REPEAT,
     # Create a 2D texture at the specified unit
     texture = GLuint() # Placeholder for the texture
     glGenTextures(1, texture) # Create one new texture
-    glActiveTexture(eval(f"GL_TEXTURE{unit}")) # Activate specified texture unit
+    glActiveTexture(_texture_units[unit]) # Activate specified texture unit
     glBindTexture(GL_TEXTURE_2D, texture) # Bind the texture
     # Set the texture wrapping/filtering options (on the currently bound texture object)
     if min_filter is None:
@@ -436,7 +678,8 @@ def create_texture(data, size=None, unit=0, warp=GL_REPEAT,
     # Load texture data
     src_fmt = None
     if data is not None:
-        data = data[::-1] # flipud: array origin is at upper left but texture is at lower left
+        if flipud:
+            data = data[::-1] # Array origin is at upper left but texture is at lower left
         height, width, n_channels = data.shape
         if n_channels == 3:
             src_fmt = GL_RGB
@@ -444,22 +687,26 @@ def create_texture(data, size=None, unit=0, warp=GL_REPEAT,
             src_fmt = GL_RGBA
         if data.dtype.kind in ['i', 'u']: # np.issubdtype(dtype, np.integer), assuming 0~255
             src_dtype = GL_UNSIGNED_BYTE
-            data = (GLubyte*data.size)(*data.astype(np.uint8).flat)
+            data = np.ascontiguousarray(data, dtype=np.uint8).ctypes.data_as(ctypes.POINTER(GLubyte))
         elif data.dtype.kind == 'f': # np.issubdtype(dtype, np.floating), assuming 0~1 or -1~1
-            assert (data.max() <= 1)
+            if validate:
+                assert (data.max() <= 1)
             src_dtype = GL_FLOAT
-            data = (GLfloat*data.size)(*data.astype(np.float32).flat)
+            data = np.ascontiguousarray(data, dtype=np.float32).ctypes.data_as(ctypes.POINTER(GLfloat))
     else:
         assert (size is not None)
         width, height = size
         src_fmt = GL_RGB
         src_dtype = GL_UNSIGNED_BYTE
-    # Relax 4-byte-alignment requirement for RGB ubyte data
-    not_aligned = (src_fmt == GL_RGB and src_dtype == GL_UNSIGNED_BYTE)
-    if not_aligned:
+    # Relax the alignment requirement for tightly packed RGB ubyte data (only if 
+    # rows are not already aligned to the current alignment, which may be altered by others)
+    not_aligned = False
+    if src_fmt == GL_RGB and src_dtype == GL_UNSIGNED_BYTE:
         alignment = GLint()
         glGetIntegerv(GL_UNPACK_ALIGNMENT, alignment)
-        glPixelStorei(GL_UNPACK_ALIGNMENT, 1) # Relax alignment
+        not_aligned = (width*3 % alignment.value != 0)
+        if not_aligned:
+            glPixelStorei(GL_UNPACK_ALIGNMENT, 1) # Relax alignment
     # (texture target (so that GL_TEXTURE_1D and 3D are unaffected), mipmap level (base level=0), 
     #   texture color format, texture width, texture height, lagacy, 
     #   source color format, source dtype, source data)
@@ -498,11 +745,11 @@ def use_texture(texture, unit=0, program=None, uniform=None):
         sampler2D uniform variable name in the fragment shader.
         e.g., b"texture1"
     '''
-    glActiveTexture(eval(f"GL_TEXTURE{unit}")) # Activate texture unit
+    glActiveTexture(_texture_units[unit]) # Activate texture unit
     glBindTexture(GL_TEXTURE_2D, texture) # Bind the texture
     if program is not None:
         glUseProgram(program) # Need to use the program before setting its uniform
-        glUniform1i(glGetUniformLocation(program, uniform), unit)
+        glUniform1i(get_uniform_location(program, uniform), unit)
 
 
 # ========== Framebuffer ==========
@@ -3,6 +3,11 @@
 import pyglet.gl as GL
 from . import gltools
 import numpy as np
+import weakref
+import math
+
+
+_framebuffers = weakref.WeakKeyDictionary() # Released framebuffers {size: [(fbo, tex), ...]} of each window for reuse
 
 
 class OffscreenWindow(object):
@@ -24,7 +29,31 @@ class OffscreenWindow(object):
             The Window object in which the stimulus will be rendered by default.
         '''
         self.win = win
-        self._fbo, self._tex = gltools.create_framebuffer(self.win.size)
+        self._size = tuple(int(x) for x in self.win.size)
+        # Reuse a released framebuffer of the same window if available 
+        # (framebuffers are not shared among OpenGL contexts)
+        pool = _framebuffers.setdefault(self.win, {}).get(self._size)
+        if pool:
+            self._fbo, self._tex = pool.pop()
+        else:
+            self._fbo, self._tex = gltools.create_framebuffer(self._size)
+
+    def release(self):
+        '''
+        Release the underlying framebuffer for reuse by offscreen windows created
+        later (e.g., in the next trial), which is cheaper than creating a new one.
+        The offscreen window should not be used anymore after release.
+        This is automatically called when the offscreen window is garbage collected.
+        '''
+        if self._fbo is not None:
+            _framebuffers.setdefault(self.win, {}).setdefault(self._size, []).append((self._fbo, self._tex))
+            self._fbo, self._tex = None, None
+
+    def __del__(self):
+        try:
+            self.release()
+        except Exception: # e.g., during interpreter shutdown
+            pass
 
     def bind(self, clear=True):
         '''
@@ -59,6 +88,65 @@ class OffscreenWindow(object):
         '''
         draw_texture(self.win, self._tex)
 
+    def blit(self):
+        '''
+        Copy the content of the offscreen window pixel by pixel to the currently
+        bound framebuffer (e.g., the back buffer of the onscreen Window) with 
+        `glBlitFramebuffer`, bypassing the shader pipeline entirely.
+
+        Unlike `draw`, which alpha-blends the content onto what is already 
+        there, `blit` overwrites the destination (including alpha). It is faster
+        and equivalent to `draw` when the offscreen content is opaque.
+        '''
+        # Only change the read framebuffer, so that the destination can be the 
+        # default Window or currently binded FBO
+        read_fbo = GL.GLint()
+        GL.glGetIntegerv(GL.GL_READ_FRAMEBUFFER_BINDING, read_fbo)
+        GL.glBindFramebuffer(GL.GL_READ_FRAMEBUFFER, self._fbo)
+        width, height = self._size
+        # (src rect, dst rect, which buffers to copy, filter)
+        GL.glBlitFramebuffer(0, 0, width, height, 0, 0, width, height, 
+            GL.GL_COLOR_BUFFER_BIT, GL.GL_NEAREST)
+        GL.glBindFramebuffer(GL.GL_READ_FRAMEBUFFER, read_fbo.value) # Restore read framebuffer
+
+
+_identity = np.eye(4, dtype=np.float32) # Transform for drawing without rotation
+_quads = weakref.WeakKeyDictionary() # Cached [vao, vbo, vertices] of the quad for each window
+_texture_programs = weakref.WeakKeyDictionary() # Cached default texture program for each window
+
+
+def _get_quad(win, src_rect, dst_rect):
+    '''
+    Get the VAO of the quad for drawing a texture, which is created once per 
+    window (VAOs are not shared among OpenGL contexts) and reused afterwards.
+    The vertex data are only re-uploaded when `src_rect` or `dst_rect` changes.
+    '''
+    vertices = [
+        # position                        # tex coords
+        dst_rect[2], dst_rect[1], 0.0,    src_rect[2], src_rect[1], # bottom right
+        dst_rect[0], dst_rect[1], 0.0,    src_rect[0], src_rect[1], # bottom left
+        dst_rect[0], dst_rect[3], 0.0,    src_rect[0], src_rect[3], # top left 
+        dst_rect[2], dst_rect[3], 0.0,    src_rect[2], src_rect[3], # top right
+    ]
+    quad = _quads.get(win)
+    if quad is None:
+        attributes = [
+            ('position', 3, False), # (name, size, normalize)
+            ('tex_coords', 2, False),
+        ]
+        indices = [
+            0, 1, 2,    # first triangle
+            3, 0, 2,    # second triangle
+        ]
+        vao, vbo, _ = gltools.create_vertex_array(vertices, attributes, indices, 
+            usage=GL.GL_DYNAMIC_DRAW, indices_usage=GL.GL_STATIC_DRAW, indices_dtype=np.uint16, 
+            return_buffers=True)
+        _quads[win] = quad = [vao, vbo, vertices]
+    elif vertices != quad[2]:
+        gltools.update_vertex_buffer(quad[1], vertices)
+        quad[2] = vertices
+    return quad[0]
+
 
 def draw_texture(win, tex, src_rect=None, dst_rect=None, rotation=0, alpha=1,
                  program=None, tex_unit=0):
@@ -98,52 +186,81 @@ def draw_texture(win, tex, src_rect=None, dst_rect=None, rotation=0, alpha=1,
         than one texture at the same time and sample from multiple textures in 
         the fragment shader.
     '''
-    # Create our VAO on-the-fly
-    if src_rect is None:
-        src_rect = [0,0, 1,1] # [left,bottom, right,top] in OpenGL texture coordinates from 0 to 1
-    if dst_rect is None:
-        dst_rect = [-1,-1, 1,1] # [left,bottom, right,top] in OpenGL normalized device coordinates from -1 to 1
-    vertices = [
-        # position                        # tex coords
-        dst_rect[2], dst_rect[1], 0.0,    src_rect[2], src_rect[1], # bottom right
-        dst_rect[0], dst_rect[1], 0.0,    src_rect[0], src_rect[1], # bottom left
-        dst_rect[0], dst_rect[3], 0.0,    src_rect[0], src_rect[3], # top left 
-        dst_rect[2], dst_rect[3], 0.0,    src_rect[2], src_rect[3], # top right
-    ]
-    attributes = [
-        ('position', 3, False), # (name, size, normalize)
-        ('tex_coords', 2, False),
-    ]
-    indices = [
-        0, 1, 2,    # first triangle
-        3, 0, 2,    # second triangle
-    ]
-    vao = gltools.create_vertex_array(vertices, attributes, indices)
+    draw_textures(win, [dict(tex=tex, src_rect=src_rect, dst_rect=dst_rect, 
+        rotation=rotation, alpha=alpha)], program=program, tex_unit=tex_unit)
+
+
+def draw_textures(win, textures, program=None, tex_unit=0):
+    '''
+    Draw multiple textures (or multiple parts of a texture) in one go, like 
+    `Screen('DrawTextures')` in Psychtoolbox.
+
+    The OpenGL states (shader program, VAO, depth and stencil tests) are set up
+    only once for all textures, and a texture is only rebound when it differs 
+    from the previous one. This is more efficient than calling `draw_texture` 
+    repeatedly, e.g., for drawing many tiles from the same texture.
+
+    Parameters
+    ----------
+    win : `psychopy.visual.Window` instance
+        See `draw_texture`.
+    textures : list of dict
+        Each dict specifies one texture to draw, with keys `tex` (required), 
+        `src_rect`, `dst_rect`, `rotation`, and `alpha` as in `draw_texture`.
+        The textures are drawn in order.
+    program : shader program (as returned by ``gltools.compile_shader_program``)
+        Compiled shader program for drawing and postprocessing the textures.
+    tex_unit : int
+        Texture unit to bind the textures.
+    '''
     # Prepare OpenGL context
     # GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, 0) # We don't need this here
     # The drawing destination can be the default Window or currently binded FBO.
-    GL.glDisable(GL.GL_DEPTH_TEST) # Disable test to ensure every fragment is copied
-    GL.glDisable(GL.GL_STENCIL_TEST)
+    # Disable test to ensure every fragment is copied (the Window keeps them 
+    # disabled unless win.depthTest/win.stencilTest, so only toggle if needed)
+    if win.depthTest:
+        GL.glDisable(GL.GL_DEPTH_TEST)
+    if win.stencilTest:
+        GL.glDisable(GL.GL_STENCIL_TEST)
     # Use our shader program
     if program is None:
-        program = _texture_program
+        program = _get_texture_program(win)
     GL.glUseProgram(program)
-    GL.glUniform1f(GL.glGetUniformLocation(program, b'globalAlpha'), alpha)
-    # Apply allocentric rotation transform inside the vertex shader
-    NT = gltools.translation([-(dst_rect[0]+dst_rect[2])/2, -(dst_rect[1]+dst_rect[3])/2, 0])
-    T = gltools.translation([(dst_rect[0]+dst_rect[2])/2, (dst_rect[1]+dst_rect[3])/2, 0])
-    R = gltools.rotation(rotation/180*np.pi)
-    trans = T @ R @ NT 
-    gltools.set_uniform(program, b'transform', trans)
-    # Bind our VAO
-    gltools.glBindVertexArray(vao)
-    # Bind our texture and activate the texture unit
-    gltools.use_texture(tex, tex_unit)
-    # Draw a rectangle (in fact, two triangles)
-    # (primitive, number of vertices to draw, dtype of indices, offset of indices)
-    # GL.glPolygonMode(GL.GL_FRONT_AND_BACK, GL.GL_LINE)
-    GL.glDrawElements(GL.GL_TRIANGLES, 6, GL.GL_UNSIGNED_INT, 0)
-    # GL.glPolygonMode(GL.GL_FRONT_AND_BACK, GL.GL_FILL)
+    alpha_loc = gltools.get_uniform_location(program, b'globalAlpha')
+    vao = None
+    last_tex = None
+    for item in textures:
+        src_rect = item.get('src_rect')
+        if src_rect is None:
+            src_rect = [0,0, 1,1] # [left,bottom, right,top] in OpenGL texture coordinates from 0 to 1
+        dst_rect = item.get('dst_rect')
+        if dst_rect is None:
+            dst_rect = [-1,-1, 1,1] # [left,bottom, right,top] in OpenGL normalized device coordinates from -1 to 1
+        # Update the vertex data of our quad (the VAO is created at first use)
+        if vao is None:
+            vao = _get_quad(win, src_rect, dst_rect)
+            gltools.glBindVertexArray(vao) # Bind our VAO once for all textures
+        else:
+            _get_quad(win, src_rect, dst_rect)
+        GL.glUniform1f(alpha_loc, item.get('alpha', 1))
+        # Apply allocentric rotation transform inside the vertex shader
+        rotation = item.get('rotation', 0)
+        if rotation == 0:
+            trans = _identity # The common case
+        else:
+            # Rotate about the center of dst_rect, i.e., T @ R @ NT in one go
+            center = [(dst_rect[0]+dst_rect[2])/2, (dst_rect[1]+dst_rect[3])/2, 0]
+            trans = gltools.rotation(math.radians(rotation), center=center)
+        gltools.set_uniform(program, b'transform', trans)
+        # Bind our texture and activate the texture unit (only if changed)
+        if item['tex'] is not last_tex:
+            last_tex = item['tex']
+            gltools.use_texture(last_tex, tex_unit)
+        # Draw a rectangle (in fact, two triangles)
+        # (primitive, number of vertices to draw, dtype of indices, offset of indices)
+        # GL.glPolygonMode(GL.GL_FRONT_AND_BACK, GL.GL_LINE)
+        GL.glDrawElements(GL.GL_TRIANGLES, 6, GL.GL_UNSIGNED_SHORT, 0)
+        # GL.glPolygonMode(GL.GL_FRONT_AND_BACK, GL.GL_FILL)
     # Reset VAO and shader program (otherwise it may interfere with e.g., SimpleImageStim)
     gltools.glBindVertexArray(0)
     GL.glUseProgram(0)
@@ -155,6 +272,9 @@ def draw_texture(win, tex, src_rect=None, dst_rect=None, rotation=0, alpha=1,
 
 
 # Old compatibility profile shaders
+# Vertex attributes bound to location 0 and 1 (matching the VAO) in the vertex shader
+vertAttributes = [b'aPos', b'aTexCoords']
+
 # Vertex shader for drawing a texture with in-plane rotation
 vertTexture_src = '''
     attribute vec3 aPos;        // Location 0
@@ -180,8 +300,18 @@ fragTexture_src = '''
     }
 '''
 
-_texture_program = gltools.compile_shader_program(vertTexture_src, fragTexture_src)
-# # For the single texture case, the following doesn't seem to be needed
-# GL.glUseProgram(_texture_program)
-# GL.glUniform1i(GL.glGetUniformLocation(_texture_program, b'aTex'), 0)
-# GL.glUseProgram(0)
\ No newline at end of file
+def _get_texture_program(win):
+    '''
+    Get the default shader program for drawing textures, which is compiled at 
+    first use for each window and reused afterwards (also for windows whose 
+    backend does not expose a pyglet context for the program cache).
+    '''
+    program = _texture_programs.get(win)
+    if program is None:
+        _texture_programs[win] = program = gltools.compile_shader_program(
+            vertTexture_src, fragTexture_src, vertAttributes)
+    # # For the single texture case, the following doesn't seem to be needed
+    # GL.glUseProgram(program)
+    # GL.glUniform1i(GL.glGetUniformLocation(program, b'aTex'), 0)
+    # GL.glUseProgram(0)
+    return program
@@ -2,10 +2,13 @@
 # -*- coding: utf-8 -*-
 # 2024-07-13: created by qcc
 import numpy as np
-import matplotlib.pyplot as plt
+from PIL import Image
 from .data import data_path
 
 
+_tags = None # Tags decoded at the first load_tags call
+
+
 def load_tags():
     '''
     Load QR code tags to be used with the pupil-labs cloud marker mapper.
@@ -23,11 +26,17 @@ def load_tags():
     ----------
     https://docs.pupil-labs.com/neon/pupil-cloud/enrichments/marker-mapper/
     '''
+    global _tags
+    if _tags is not None:
+        return _tags.copy() # Skip decoding the images again
     tags = []
     for fname in ['apriltags_tag36h11_0-23.jpg', 'apriltags_tag36h11_24-47.jpg']:
-        im = plt.imread(f"{data_path}/{fname}")
-        for m in range(6):
-            for n in range(4):
-                tags.append(im[65+m*384:448+m*384,65+n*384:448+n*384])
-    tags = np.array(tags) # 48*383*383, uint8
+        im = np.asarray(Image.open(f"{data_path}/{fname}").convert('L'))
+        # The tags are laid out in a 6*4 grid with a pitch of 384 pixels, 
+        # starting from (65,65). Cut the grid into cells with one reshape, i.e.,
+        # tag[m*4+n] = im[65+m*384:448+m*384, 65+n*384:448+n*384]
+        grid = im[65:65+6*384,65:65+4*384].reshape(6,384,4,384)[:,:383,:,:383]
+        tags.append(grid.transpose(0,2,1,3).reshape(24,383,383))
+    tags = np.concatenate(tags) # 48*383*383, uint8
+    _tags = tags.copy()
     return tags
@@ -1,7 +1,7 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 # 2024-05-13: created by qcc
-import platform
+import platform, time, contextlib
 import numpy as np
 from psychopy import visual, layout
 import pyglet.gl as GL
@@ -12,7 +12,7 @@ sys_platform = platform.system()
 
 class StereoWindow(visual.Window):
     def __init__(self, win=None, stereoMode='left/right', crossTalk=None, 
-                 flipCallback=None, **kwargs):
+                 flipCallback=None, flipCallbackDelay=0, **kwargs):
         '''
         A subclass of `psychopy.visual.Window` that supports many common 
         stereo modes, similar to Psychtoolbox in Matlab.
@@ -111,12 +111,19 @@ class StereoWindow(visual.Window):
             Immediatedly called after the `flip` for corresponding eye returns 
             in 'sequential' mode. Useful for sending sync signal to the goggles 
             or shutter glasses, e.g., the first generation NNL goggles.
+        flipCallbackDelay : float
+            Delay (in seconds) after the `flip` returns before calling the 
+            `flipCallback`, e.g., to align the sync signal with the actual 
+            onset of the frame given the (measured) latency of the display. 
+            The delay is implemented by busy waiting for precise timing.
         '''
         # Initialize property variables
         self._fixationOffset = np.r_[0.0, 0.0]
         self._fixationVergence = 0.0
         self._fixationTilt = 0.0
-        self._crossTalk = np.r_[0.0, 0.0]
+        self._unitScale = None # (units, pixels per unit) cached by `_getUnitScale`
+        self._crossTalk = np.zeros(2, dtype=np.float32) # Same as the GL uniform
+        self._eyeFBOs = None # FBO of each eye for FBO-based stereo modes
         # Handle the special case of 'quad-buffered' mode (requiring special backend window)
         if stereoMode == 'quad-buffered':
             self._stereoMode = stereoMode # Without calling the setter
@@ -137,50 +144,20 @@ class StereoWindow(visual.Window):
             # Prepare framebuffers for binocular rendering
             # Create left eye and right eye framebuffers 
             # (for 'sequential' and anaglyph stereo modes)
-            self._fboLE, self._texLE = gltools.create_framebuffer(self.size)
-            self._fboRE, self._texRE = gltools.create_framebuffer(self.size)
+            # Window size in pixels, which is also the size of the eye FBOs
+            # (cached as plain ints for computing viewports in every flip)
+            self._sz = (int(self.size[0]), int(self.size[1]))
+            self._fboLE, self._texLE = gltools.create_framebuffer(self._sz)
+            self._fboRE, self._texRE = gltools.create_framebuffer(self._sz)
             for buffer in [self._fboLE, self._fboRE, 0]:
                 # Initialize FBO color to window background color
                 # Without this, the default color is blue if flip before setBuffer
                 GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, buffer)
                 self.clearBuffer()
             
-            # Compile shader programs for different stereo modes
+            # Shader programs for different stereo modes are compiled lazily 
+            # on first use (see `_compileShaderFor`)
             self._stereoShaders = {}
-            for mode in ['red/green', 'green/red', 'red/blue', 'blue/red',
-                'red/green-anticross', 'green/red-anticross', 'red/blue-anticross', 'blue/red-anticross']:
-                # Compile and link shader programs for anaglyph modes
-                program = gltools.compile_shader_program(
-                    vertTexture_src, fragAnaglyph_src[mode])
-                # Set uniform values, associating sampler2D with correspondent texture unit
-                gltools.use_texture(self._texLE, 0, program, b"textureLE")
-                gltools.use_texture(self._texRE, 1, program, b"textureRE")
-                self._stereoShaders[mode] = program
-            # Shader program for 'sequential' and 'side-by-side-compressed' modes
-            program = gltools.compile_shader_program(
-                vertTexture_src, fragTexture_src)
-            gltools.use_texture(self._texLE, 0, program, b"aTex")
-            for mode in ['sequential', 'side-by-side-compressed']:
-                self._stereoShaders[mode] = program
-            # Shader program for 'left/right' and 'right/left' modes
-            program = gltools.compile_shader_program(
-                vertCentralX_src, fragTexture_src)
-            gltools.use_texture(self._texLE, 0, program, b"aTex")
-            for mode in ['left/right', 'right/left']:
-                self._stereoShaders[mode] = program
-            # Shader program for 'top/bottom' and 'bottom/top' modes
-            program = gltools.compile_shader_program(
-                vertCentralY_src, fragTexture_src)
-            gltools.use_texture(self._texLE, 0, program, b"aTex")
-            for mode in ['top/bottom', 'bottom/top']:
-                self._stereoShaders[mode] = program
-            # Shader program for 'top/bottom-anticross' and 'bottom/top-anticross' modes
-            program = gltools.compile_shader_program(
-                vertCentralY_src, fragCompensated_src)
-            # Have to handle texture units and uniforms later at draw time
-            for mode in ['top/bottom-anticross', 'bottom/top-anticross']:
-                self._stereoShaders[mode] = program
-            GL.glUseProgram(0) # Reset shader program
             
             # Create VAO for drawing framebuffers to screen
             vertices = [
@@ -200,12 +177,14 @@ class StereoWindow(visual.Window):
             ]
             self._screenVAO = gltools.create_vertex_array(vertices, attributes, indices)
             
+            # Set cross-talk factors (before the stereo mode, so that the 
+            # shader program is only resolved once)
+            self.crossTalk = crossTalk
             # Set stereo mode (except for 'quad-buffered' mode)
             self.stereoMode = stereoMode
-            # Set cross-talk factors
-            self.crossTalk = crossTalk
             # Set flip callback
             self.flipCallback = flipCallback # `func(eye)`
+            self.flipCallbackDelay = flipCallbackDelay
             
             # Create psychopy.visual.Line for drawing blue sync lines in 'sequential' mode
             # Note that layout.Vector will always return nominal pixel value, 
@@ -219,10 +198,12 @@ class StereoWindow(visual.Window):
                 posfix = {'top': np.r_[0,0.5], 'bottom': np.r_[0,0]}
             else: # For Windows
                 posfix = {'top': np.r_[0,0], 'bottom': np.r_[0,0.5]}
+            # Convert 'norm' to nominal 'pix' only once (a norm unit is half the window)
+            half = layout.Vector([1,1], 'norm', self).pix
             self._blueLines = {}
             for loc, y in zip(['top', 'bottom'], [1, -1]):
-                start = layout.Vector([-1,y], 'norm', self).pix - np.sign(y)*posfix[loc]
-                end = layout.Vector([1,y], 'norm', self).pix - np.sign(y)*posfix[loc]
+                start = np.r_[-1,y]*half - y*posfix[loc]
+                end = np.r_[1,y]*half - y*posfix[loc]
                 for eye, color in zip(['left', 'right'], [[255,255,255], [0,0,0]]):
                     # Blue line in left eye, black line in right eye
                     self._blueLines[eye,loc] = visual.Line(win=self, units='pix', 
@@ -260,7 +241,58 @@ class StereoWindow(visual.Window):
         '''
         if stereoMode == 'quad-buffered' or self.stereoMode == 'quad-buffered':
             raise ValueError("'quad-buffered' mode can only be specified during window initialization. Once set, it cannot be changed.")
+        if stereoMode not in stereoLayouts:
+            raise ValueError(f"Unknown stereoMode '{stereoMode}' requested in StereoWindow")
         self._stereoMode = stereoMode
+        self._resolveStereoMode()
+        # Resolve the FBOs once here, so that `setBuffer` needs not check the mode
+        self._eyeFBOs = None if stereoMode == 'none' else {'left': self._fboLE, 'right': self._fboRE}
+
+
+    def _resolveStereoMode(self):
+        '''
+        Resolve everything `flip` needs for the current stereo mode (and 
+        cross-talk factors) once here, so that it needs not parse the mode 
+        string every frame.
+        '''
+        mode = self.stereoMode
+        if mode in ['top/bottom-anticross', 'bottom/top-anticross'] and not self._crossTalk.any():
+            # Without cross-talk, there is nothing to compensate, so draw both 
+            # eyes without sampling the other eye
+            mode = mode.split('-')[0]
+        self._layout = stereoLayouts[mode]
+        self._anticross = mode.endswith('-anticross')
+        self._stereoShader = None if mode == 'none' else self._compileShaderFor(mode)
+        self._texTransform = texTransforms.get(mode, (1.0, 1.0, 0.0, 0.0))
+        if self._layout == 'side':
+            # (eye, sign) for the left and the right part of the screen, where 
+            # the sign of fixation shifts is positive for the LE and negative for the RE
+            self._sideEyes = [(eye, 1 if eye=='left' else -1) for eye in mode.split('/')]
+        elif self._layout == 'anaglyph':
+            self._updateAnaglyphMix()
+
+
+    def _compileShaderFor(self, mode):
+        '''
+        Get the shader program for a stereo mode, compiling it on first use.
+        Modes with identical shader sources share the same program.
+        '''
+        program = self._stereoShaders.get(mode)
+        if program is None:
+            # The setters may be called while another window's context is current
+            self._setCurrent()
+            vertex_source, fragment_source, samplers = stereoShader_src[mode]
+            program = gltools.compile_shader_program(
+                vertex_source, fragment_source, vertAttributes)
+            # Set uniform values, associating sampler2D with correspondent texture unit
+            # (LE on unit 0 and RE on unit 1). Textures are only bound at draw 
+            # time, so that texture state is left untouched for PsychoPy here.
+            GL.glUseProgram(program) # Need to use the program before setting its uniform
+            for unit, sampler in enumerate(samplers):
+                GL.glUniform1i(gltools.get_uniform_location(program, sampler), unit)
+            GL.glUseProgram(0) # Reset shader program
+            self._stereoShaders[mode] = program
+        return program
 
 
     def setBuffer(self, buffer, clear=True):
@@ -273,23 +305,25 @@ class StereoWindow(visual.Window):
             Buffer to draw to. Can either be 'left' or 'right'.
         clear : bool, optional
             Clear the buffer before drawing. Default is `True`.
+            Set to `False` if the following drawing will cover the whole buffer
+            anyway (e.g., a full-screen image or background), which saves a 
+            full-buffer write per eye per frame.
         '''
-        if self.stereoMode == 'quad-buffered':
-            # Call base class method
-            super().setBuffer(buffer, clear=clear)
-        elif self.stereoMode == 'none': # Mono display (no stereo)
-            # Bind the default framebuffer
-            GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, 0)
+        if self._eyeFBOs is None:
+            if self.stereoMode == 'quad-buffered':
+                # Call base class method
+                super().setBuffer(buffer, clear=clear)
+            else: # Mono display (no stereo)
+                # Bind the default framebuffer
+                GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, 0)
         else: # For all other stereo modes (which are FBO-based)
             # Redirect drawing to FBO of the corresponding eye
-            if buffer == 'left':
-                # Bind left eye framebuffer and redirect following drawings there
-                GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self._fboLE)
-            elif buffer == 'right':
-                # Bind right eye framebuffer and redirect following drawings there
-                GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self._fboRE)
-            else:
+            try:
+                fbo = self._eyeFBOs[buffer]
+            except KeyError:
                 raise ValueError(f"Unknown buffer '{buffer}' requested in StereoWindow.setBuffer")
+            # Bind the eye's framebuffer and redirect following drawings there
+            GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, fbo)
             # Clear the FBO before subsequent drawings
             if clear:
                 # GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT | GL.GL_STENCIL_BUFFER_BIT)
@@ -316,123 +350,147 @@ class StereoWindow(visual.Window):
             Wall-clock time in seconds the flip completed. Returns `None` if
             `self.waitBlanking` is `False`.
         '''
-        if self.stereoMode in ['none', 'quad-buffered']:
+        if self._eyeFBOs is None: # 'none' and 'quad-buffered'
             # Call base class method
             flipTime = super().flip(clearBuffer=clearBuffer)
         else: # For all other FBO-based stereo modes
-            # Execute and replace autoDraw
-            backup = self._toDraw
-            self._toDraw = []
-            self._executeAutoDraw(backup)
+            w, h = self._sz
+            # Draw autoDraw stimuli into the eye FBOs 
+            # (and hide them from the base class flip below)
+            self._executeAutoDraw(self._toDraw)
             # Blip FBOs
-            if self.stereoMode in ['side-by-side-compressed']:
+            self._beginBlip()
+            if self._layout == 'split':
                 # Note that glViewport along doesn't work with TextStim and SimpleImageStim
                 # So we still need to use FBO for 'left/right' and 'side-by-side-compressed'
-                # Render on the left part of the screen
-                GL.glViewport(0, 0, self.size[0]//2, self.size[1])
-                self._blipEyeBuffer(eye='left')
-                # Render on the right part of the screen
-                GL.glViewport(self.size[0]//2, 0, self.size[0]//2, self.size[1])
-                self._blipEyeBuffer(eye='right')
-            elif self.stereoMode in ['left/right', 'right/left']:
-                eyes = self.stereoMode.split('/')
-                sign = lambda eye: 1 if eye=='left' else -1 # Positive for the LE, and negative for the RE
-                # Render on the left part of the screen
-                GL.glViewport(int(self._fixationOffset[0] + sign(eyes[0])*self._fixationVergence), 
-                    int(self._fixationOffset[1] + sign(eyes[0])*self._fixationTilt), 
-                    self.size[0]//2, self.size[1])
-                self._blipEyeBuffer(eye=eyes[0])
-                # Render on the right part of the screen
-                GL.glViewport(int(self.size[0]//2 + self._fixationOffset[0] + sign(eyes[1])*self._fixationVergence), 
-                    int(self._fixationOffset[1] + sign(eyes[1])*self._fixationTilt), 
-                    self.size[0]//2, self.size[1])
-                self._blipEyeBuffer(eye=eyes[1])
-            elif self.stereoMode in ['top/bottom', 'bottom/top', 'top/bottom-anticross', 'bottom/top-anticross']:
-                eyes = {k: v for k, v in zip(self.stereoMode.split('-')[0].split('/'), ['left', 'right'])}
-                # Render on the top part of the screen
-                GL.glViewport(0, self.size[1]//2, self.size[0], self.size[1]//2)
-                self._blipEyeBuffer(eye=eyes['top'])
-                # Render on the bottom part of the screen
-                GL.glViewport(0, 0, self.size[0], self.size[1]//2)
-                self._blipEyeBuffer(eye=eyes['bottom'])
-            elif self.stereoMode in ['red/green', 'green/red', 'red/blue', 'blue/red',
-                'red/green-anticross', 'green/red-anticross', 'red/blue-anticross', 'blue/red-anticross']:
+                # Render both eyes to their parts of the screen in a single pass
+                GL.glViewport(0, 0, w, h)
+                self._blipEyeBuffer(eye='both')
+            elif self._layout == 'side':
+                # Render on the left and then the right part of the screen
+                for k, (eye, sign) in enumerate(self._sideEyes):
+                    GL.glViewport(int(k*(w//2) + self._fixationOffset[0] + sign*self._fixationVergence), 
+                        int(self._fixationOffset[1] + sign*self._fixationTilt), 
+                        w//2, h)
+                    self._blipEyeBuffer(eye=eye)
+            elif self._layout == 'anaglyph':
                 # Combine left eye and right eye framebuffers and draw to screen
                 self._blipEyeBuffer(eye='both')
-            elif self.stereoMode in ['sequential']:
+            elif self._layout == 'sequential':
                 # We need to flip twice in 'sequential' mode
                 self._blipEyeBuffer(eye='left')
+                self._endBlip()
                 self._drawBlueLine(eye='left')
-                flipTime0 = super().flip(clearBuffer=clearBuffer)
+                with self._noAutoDraw():
+                    flipTime0 = super().flip(clearBuffer=clearBuffer)
                 if self.flipCallback is not None:
-                    self.flipCallback(eye='left')
+                    self._callFlipCallback(eye='left')
+                self._beginBlip()
                 self._blipEyeBuffer(eye='right')
+            self._endBlip()
+            if self._layout == 'sequential':
                 self._drawBlueLine(eye='right')
             # Call base class method
-            flipTime = super().flip(clearBuffer=clearBuffer)
-            if self.stereoMode in ['sequential'] and self.flipCallback is not None:
-                self.flipCallback(eye='right')
-            # Restore autoDraw
-            self._toDraw = backup
+            with self._noAutoDraw():
+                flipTime = super().flip(clearBuffer=clearBuffer)
+            if self._layout == 'sequential' and self.flipCallback is not None:
+                self._callFlipCallback(eye='right')
         # Return flip time
         return flipTime
 
 
+    @contextlib.contextmanager
+    def _noAutoDraw(self):
+        '''
+        Temporarily empty the autoDraw list, so that the base class `flip` 
+        will not draw autoDraw stimuli directly to the screen (they have 
+        already been drawn into the eye FBOs). The list is put back on exit, 
+        even if the flip raises.
+        '''
+        stimList, self._toDraw = self._toDraw, []
+        try:
+            yield
+        finally:
+            self._toDraw = stimList
+
+
+    def _callFlipCallback(self, eye):
+        '''
+        Call `flipCallback` for the eye after `flipCallbackDelay` (if any).
+        '''
+        if self.flipCallbackDelay > 0:
+            tCall = time.perf_counter() + self.flipCallbackDelay
+            while time.perf_counter() < tCall: # Busy waiting (sleep is not precise enough)
+                pass
+        self.flipCallback(eye=eye)
+
+
+    def _beginBlip(self):
+        '''
+        Prepare OpenGL states for drawing eye framebuffers to the screen, which
+        are shared by the (one or two) following `_blipEyeBuffer` calls.
+        '''
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, 0) # Back to default
+        GL.glDisable(GL.GL_DEPTH_TEST) # Disable test to ensure every fragment is copied
+        GL.glDisable(GL.GL_STENCIL_TEST)
+        GL.glUseProgram(self._stereoShader) # Use stereo shader
+        # Programs are shared by modes (and windows sharing GL objects) with 
+        # different texture transforms, so set it for the current mode every time
+        GL.glUniform4f(gltools.get_uniform_location(self._stereoShader, b"texTransform"), 
+            *self._texTransform)
+        if self._layout == 'anaglyph':
+            # All anaglyph modes share one program (possibly with other windows), 
+            # so set the color mixing for the current mode every time
+            gltools.set_uniforms(self._stereoShader, self._anaglyphMix)
+        elif self._anticross: # top/bottom-anticross and bottom/top-anticross
+            GL.glUniform2f(gltools.get_uniform_location(self._stereoShader, b"crossTalk"), 
+                self._crossTalk[0], self._crossTalk[1])
+        gltools.glBindVertexArray(self._screenVAO) # Switch to screen-copy VAO
+
+
+    def _endBlip(self):
+        '''
+        Restore OpenGL states after drawing eye framebuffers to the screen.
+        '''
+        # Reset VAO and shader program (otherwise it may interfere with e.g., SimpleImageStim)
+        gltools.glBindVertexArray(0) # Fixed bug: 2024-05-15 by qcc
+        GL.glUseProgram(0) # Without this SimpleImageStim will not work
+        # Re enable depth and stencil tests according to Window settings
+        if self.depthTest:
+            GL.glEnable(GL.GL_DEPTH_TEST)
+        if self.stencilTest:
+            GL.glEnable(GL.GL_STENCIL_TEST)
+
+
     def _blipEyeBuffer(self, eye):
         '''
         Draw left eye and/or right eye framebuffers to the screen,
         combining the content from the two buffers if necessary 
         (e.g., in anaglyph modes).
+        Must be called between `_beginBlip()` and `_endBlip()`.
 
         Parameters
         ----------
         eye : str
             'both' | 'left' | 'right'
         '''
-        # Prepare OpenGL context
-        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, 0) # Back to default
-        GL.glDisable(GL.GL_DEPTH_TEST) # Disable test to ensure every fragment is copied
-        GL.glDisable(GL.GL_STENCIL_TEST)
-        program = self._stereoShaders[self.stereoMode]
-        GL.glUseProgram(program) # Use stereo shader
-        gltools.glBindVertexArray(self._screenVAO) # Switch to screen-copy VAO
         if eye == 'both':
             gltools.use_texture(self._texLE, 0) # Bind LE to texture unit 0
             gltools.use_texture(self._texRE, 1) # Bind RE to texture unit 1
         elif eye == 'left':
-            if self.stereoMode.endswith('anticross'): 
-                # Set texture and crossTalk uniforms every frame for top/bottom-anticross
-                gltools.use_texture(self._texLE, 0, program, b"textureThis")
-                gltools.use_texture(self._texRE, 1, program, b"textureOther")
-                GL.glUniform3f(GL.glGetUniformLocation(program, b"crossTalk"), 
-                    self._crossTalk[0], self._crossTalk[0], self._crossTalk[0])
-            else:
-                gltools.use_texture(self._texLE, 0) # Bind LE to texture unit 0
+            gltools.use_texture(self._texLE, 0) # Bind LE to texture unit 0
         elif eye == 'right':
-            if self.stereoMode.endswith('anticross'):
-                gltools.use_texture(self._texRE, 0, program, b"textureThis")
-                gltools.use_texture(self._texLE, 1, program, b"textureOther")
-                GL.glUniform3f(GL.glGetUniformLocation(program, b"crossTalk"), 
-                    self._crossTalk[1], self._crossTalk[1], self._crossTalk[1])
-            else:
-                gltools.use_texture(self._texRE, 0) # Bind RE to texture unit 0
+            gltools.use_texture(self._texRE, 0) # Bind RE to texture unit 0
         # Draw a rectangle (in fact, two triangles)
         # (primitive, number of vertices to draw, dtype of indices, offset of indices)
         GL.glDrawElements(GL.GL_TRIANGLES, 6, GL.GL_UNSIGNED_INT, 0)
-        # Reset VAO and shader program (otherwise it may interfere with e.g., SimpleImageStim)
-        gltools.glBindVertexArray(0) # Fixed bug: 2024-05-15 by qcc
-        GL.glUseProgram(0) # Without this SimpleImageStim will not work
-        # Re enable depth and stencil tests according to Window settings
-        if self.depthTest:
-            GL.glEnable(GL.GL_DEPTH_TEST)
-        if self.stencilTest:
-            GL.glEnable(GL.GL_STENCIL_TEST)
 
 
     def _executeAutoDraw(self, stimList):
-        for stim in stimList:
-            for buffer in ['left', 'right']:
-                self.setBuffer(buffer, clear=False)
+        # Bind each eye's FBO only once and draw all autoDraw stimuli into it
+        for buffer in ['left', 'right']:
+            self.setBuffer(buffer, clear=False)
+            for stim in stimList:
                 stim.draw()
 
 
@@ -472,22 +530,41 @@ class StereoWindow(visual.Window):
 
         Parameters
         ----------
-        crossTalk : array-like of shape (2,)
+        crossTalk : array-like of shape (2,) or float
             [leakage in the LE from the RE, leakage in the RE from the LE]. E.g.,
             [0.1, 0.05] means the left eye can see 10% of the right eye image, 
             while the right eye can see 5% of the left eye image.
+            A single value is used for both eyes.
         '''
         if crossTalk is None:
-            crossTalk = [0, 0]
-        self._crossTalk[0] = max(0.0, min(1.0, crossTalk[0]))
-        self._crossTalk[1] = max(0.0, min(1.0, crossTalk[1]))
-        for mode in ['red/green-anticross', 'green/red-anticross', 'red/blue-anticross', 'blue/red-anticross']:
-            program = self._stereoShaders[mode]
-            GL.glUseProgram(program) # Use stereo shader
-            GL.glUniform2f(GL.glGetUniformLocation(program, b"crossTalk"), 
-                self._crossTalk[0], self._crossTalk[1])
-            GL.glUseProgram(0) # Reset shader
-        # Note that the crossTalk uniform is set at draw time for top/bottom-anticross
+            crossTalk = 0
+        # Clip into [0,1] and write in place (a scalar applies to both eyes)
+        np.clip(crossTalk, 0.0, 1.0, out=self._crossTalk)
+        if self.stereoMode not in [None, 'quad-buffered']: # None during initialization
+            self._resolveStereoMode()
+        # Note that the crossTalk uniforms are set at draw time for all anticross modes
+
+
+    def _updateAnaglyphMix(self):
+        '''
+        Compute the color mixing uniforms of the anaglyph shader for the 
+        current stereo mode and cross-talk factors, such that
+        `gl_FragColor = mixLE*colorLE + mixRE*colorRE + mixOffset`.
+        '''
+        cLE, cRE = anaglyphChannels[self.stereoMode.split('-')[0]]
+        mixLE = np.zeros((4,4), dtype=np.float32)
+        mixRE = np.zeros((4,4), dtype=np.float32)
+        mixOffset = np.r_[0.0, 0.0, 0.0, 1.0].astype(np.float32) # Opaque output
+        mixLE[cLE,cLE] = 1
+        mixRE[cRE,cRE] = 1
+        if self._anticross:
+            # Subtract the "anti-image" of the other eye around mid-luminance, 
+            # i.e., ((this*2-1) - crossTalk*(other*2-1) + 1)/2
+            mixLE[cRE,cLE] = -self._crossTalk[1]
+            mixRE[cLE,cRE] = -self._crossTalk[0]
+            mixOffset[cLE] = self._crossTalk[0]/2
+            mixOffset[cRE] = self._crossTalk[1]/2
+        self._anaglyphMix = {b"mixLE": mixLE, b"mixRE": mixRE, b"mixOffset": mixOffset}
 
 
     @property
@@ -496,8 +573,7 @@ class StereoWindow(visual.Window):
         Get the horizontal and vertical offset of the fixation point in the units 
         of the window (e.g., 'deg') in 'left/right' or 'right/left' stereo modes.
         '''
-        v = layout.Vector(self._fixationOffset, 'pix', self)
-        return getattr(v, self.units)
+        return self._fromPix(self._fixationOffset)
 
     @fixationOffset.setter
     def fixationOffset(self, offset):
@@ -516,13 +592,11 @@ class StereoWindow(visual.Window):
         offset : array-like of shape (2,)
             [horizontal, vertical]
         '''
-        v = layout.Vector(offset, self.units, self)
-        self._fixationOffset = v.pix
+        self._fixationOffset = self._toPix(np.asarray(offset, dtype=float))
 
     @property
     def fixationVergence(self):
-        v = layout.Vector([self._fixationVergence, 0], 'pix', self)
-        return getattr(v, self.units)[0]
+        return self._fromPix(np.r_[self._fixationVergence, 0])[0]
 
     @fixationVergence.setter
     def fixationVergence(self, vergence):
@@ -539,13 +613,11 @@ class StereoWindow(visual.Window):
         vergence : float
             In the units of the window (e.g., 'deg').
         '''
-        v = layout.Vector([vergence, 0], self.units, self)
-        self._fixationVergence = v.pix[0]
+        self._fixationVergence = self._toPix(np.r_[vergence, 0])[0]
 
     @property
     def fixationTilt(self):
-        v = layout.Vector([0, self._fixationTilt], 'pix', self)
-        return getattr(v, self.units)[1]
+        return self._fromPix(np.r_[0, self._fixationTilt])[1]
 
     @fixationTilt.setter
     def fixationTilt(self, tilt):
@@ -562,49 +634,59 @@ class StereoWindow(visual.Window):
         tilt : float
             In the units of the window (e.g., 'deg').
         '''
-        v = layout.Vector([0, tilt], self.units, self)
-        self._fixationTilt = v.pix[1]
+        self._fixationTilt = self._toPix(np.r_[0, tilt])[1]
 
+    def _getUnitScale(self):
+        '''
+        Get nominal pixels per window unit in x and y, which is computed once 
+        per `units` (set `win._unitScale = None` after modifying the monitor).
+        Return None for units whose conversion is not linear (e.g., 'degFlat').
+        '''
+        if self._unitScale is None or self._unitScale[0] != self.units:
+            scale = layout.Vector([1,1], self.units, self).pix if self.units in linearUnits else None
+            self._unitScale = (self.units, scale)
+        return self._unitScale[1]
+
+    def _toPix(self, v):
+        '''
+        Convert a vector from the units of the window to nominal pixels.
+        '''
+        scale = self._getUnitScale()
+        if scale is None:
+            return layout.Vector(v, self.units, self).pix
+        return v * scale
+
+    def _fromPix(self, v):
+        '''
+        Convert a vector from nominal pixels to the units of the window.
+        '''
+        scale = self._getUnitScale()
+        if scale is None:
+            return getattr(layout.Vector(v, 'pix', self), self.units)
+        return v / scale
+
+
+
+# Window units that are converted to pixels by a constant scale
+linearUnits = ['pix', 'norm', 'height', 'cm', 'deg']
 
 
 # Old compatibility profile shaders to draw binocular FBOs to screen
-# Vertex shader for drawing the whole texture (for most FBO-based modes)
+# Vertex attributes bound to location 0 and 1 (matching the VAO) in all vertex shaders
+vertAttributes = [b'aPos', b'aTexCoords']
+
+# Vertex shader for drawing the whole texture, or only its central part 
+# (e.g., in 'left/right' modes), by scaling and shifting the texture coordinates
+# with `texTransform` = (scale.x, scale.y, shift.x, shift.y) (see `texTransforms`)
 vertTexture_src = '''
     attribute vec3 aPos;        // Location 0
     attribute vec2 aTexCoords;  // Location 1
     varying vec2 TexCoords;     // out
+    uniform vec4 texTransform;
     void main()
     {
         gl_Position = vec4(aPos.x, aPos.y, 0.0, 1.0); 
-        TexCoords = aTexCoords;
-    }  
-'''
-
-# Vertex shader for drawing the central part of the texture in x direction
-# (for 'left/right' and 'right/left' modes)
-vertCentralX_src = '''
-    attribute vec3 aPos;        // Location 0
-    attribute vec2 aTexCoords;  // Location 1
-    varying vec2 TexCoords;     // out
-    void main()
-    {
-        gl_Position = vec4(aPos.x, aPos.y, 0.0, 1.0);
-        float frac = 0.5;
-        TexCoords = vec2((1.0-frac)/2.0+frac*aTexCoords.x, aTexCoords.y);
-    }  
-'''
-
-# Vertex shader for drawing the central part of the texture in y direction
-# (for 'top/bottom' and 'bottom/top' modes)
-vertCentralY_src = '''
-    attribute vec3 aPos;        // Location 0
-    attribute vec2 aTexCoords;  // Location 1
-    varying vec2 TexCoords;     // out
-    void main()
-    {
-        gl_Position = vec4(aPos.x, aPos.y, 0.0, 1.0);
-        float frac = 0.5;
-        TexCoords = vec2(aTexCoords.x, (1.0-frac)/2.0+frac*aTexCoords.y);
+        TexCoords = aTexCoords*texTransform.xy + texTransform.zw;
     }  
 '''
 
@@ -618,57 +700,105 @@ fragTexture_src = '''
     }
 '''
 
-# Fragment shaders for non-anaglyph modes with cross-talk compensation
-fragCompensated_src = '''
+# Fragment shaders for drawing both eyes side by side or stacked in a single pass
+# (equivalent to drawing the central part of each eye in half of the viewport),
+# with or without cross-talk compensation ('*-anticross')
+fragSplitScreen_src = {}
+for mode, cond, first, second in [
+        # (mode, condition for the first eye, (first eye, tex coords), (second eye, tex coords))
+        ('side-by-side-compressed', 'TexCoords.x < 0.5', 
+            ('LE', 'vec2(TexCoords.x*2.0, TexCoords.y)'), 
+            ('RE', 'vec2(TexCoords.x*2.0-1.0, TexCoords.y)')),
+        ('top/bottom', 'TexCoords.y >= 0.5', 
+            ('LE', 'vec2(TexCoords.x, TexCoords.y-0.25)'), 
+            ('RE', 'vec2(TexCoords.x, TexCoords.y+0.25)')),
+        ('bottom/top', 'TexCoords.y >= 0.5', 
+            ('RE', 'vec2(TexCoords.x, TexCoords.y-0.25)'), 
+            ('LE', 'vec2(TexCoords.x, TexCoords.y+0.25)')),
+    ]:
+    for suffix in ([''] if mode == 'side-by-side-compressed' else ['', '-anticross']):
+        colors = []
+        for eye, uv in [first, second]:
+            color = f'texture2D(texture{eye}, {uv})'
+            if suffix == '-anticross':
+                # Compensate with the other eye at the same location
+                other, k = ('RE', 'x') if eye == 'LE' else ('LE', 'y')
+                color = f'compensate({color}, texture2D(texture{other}, {uv}), crossTalk.{k})'
+            colors.append(color)
+        fragSplitScreen_src[mode+suffix] = f'''
+            varying vec2 TexCoords;     // in
+            uniform sampler2D textureLE;
+            uniform sampler2D textureRE;
+            uniform vec2 crossTalk;     // Cross talk from the other eye [LE, RE]
+            vec4 compensate(vec4 colorThis, vec4 colorOther, float k)
+            {{
+                // Same as ((colorThis*2.0-1.0) - k*(colorOther*2.0-1.0) + 1.0)/2.0,
+                // i.e., subtract the "anti-image" around mid-luminance, in a single MAD
+                // (the output is clamped to [0,1] when written to the framebuffer)
+                return vec4(k, k, k, 0.0)*(0.5 - colorOther) + colorThis;
+            }}
+            void main()
+            {{
+                if ({cond})
+                    gl_FragColor = {colors[0]};
+                else
+                    gl_FragColor = {colors[1]};
+            }}
+        '''
+
+# Fragment shader for all anaglyph modes, which mixes the color channels of the 
+# two eyes by matrices (see `StereoWindow._updateAnaglyphMix`), with or without 
+# cross-talk compensation
+fragAnaglyph_src = '''
     varying vec2 TexCoords;     // in
-    uniform sampler2D textureThis;
-    uniform sampler2D textureOther;
-    uniform vec3 crossTalk;     // RGB cross talk from the other eye
+    uniform sampler2D textureLE;
+    uniform sampler2D textureRE;
+    uniform mat4 mixLE;
+    uniform mat4 mixRE;
+    uniform vec4 mixOffset;
     void main()
     {
-        vec4 colorThis = texture2D(textureThis, TexCoords);
-        vec4 colorOther = texture2D(textureOther, TexCoords);
-        gl_FragColor = ((colorThis*2.0-1.0) - vec4(crossTalk, 0)*(colorOther*2.0-1.0) +1.0)/2.0;
+        vec4 colorLE = texture2D(textureLE, TexCoords);
+        vec4 colorRE = texture2D(textureRE, TexCoords);
+        gl_FragColor = mixLE*colorLE + mixRE*colorRE + mixOffset;
     }
 '''
 
-fragAnaglyph_src = {}
-# Fragment shaders for anaglyph modes
-for mode, cmd in [  ('red/green', 'vec4(colorLE.r, colorRE.g, 0.0, 1.0)'),
-                    ('green/red', 'vec4(colorRE.r, colorLE.g, 0.0, 1.0)'),
-                    ('red/blue',  'vec4(colorLE.r, 0.0, colorRE.b, 1.0)'),
-                    ('blue/red',  'vec4(colorRE.r, 0.0, colorLE.b, 1.0)'),
-                 ]:
-    fragAnaglyph_src[mode] = f'''
-        varying vec2 TexCoords;     // in
-        uniform sampler2D textureLE;
-        uniform sampler2D textureRE;
-        void main()
-        {{
-            vec4 colorLE = texture2D(textureLE, TexCoords);
-            vec4 colorRE = texture2D(textureRE, TexCoords);
-            gl_FragColor = {cmd};
-        }}
-    '''
-
-# Fragment shaders for anaglyph modes with cross-talk compensation
-for mode, cmd in [  ('red/green-anticross', 'vec4(((colorLE.r*2.0-1.0) - crossTalk.x*(colorRE.g*2.0-1.0) +1.0)/2.0, ((colorRE.g*2.0-1.0) - crossTalk.y*(colorLE.r*2.0-1.0) +1.0)/2.0, 0.0, 1.0)'),
-                    ('green/red-anticross', 'vec4(((colorRE.r*2.0-1.0) - crossTalk.y*(colorLE.g*2.0-1.0) +1.0)/2.0, ((colorLE.g*2.0-1.0) - crossTalk.x*(colorRE.r*2.0-1.0) +1.0)/2.0, 0.0, 1.0)'),
-                    ('red/blue-anticross',  'vec4(((colorLE.r*2.0-1.0) - crossTalk.x*(colorRE.b*2.0-1.0) +1.0)/2.0, 0.0, ((colorRE.b*2.0-1.0) - crossTalk.y*(colorLE.r*2.0-1.0) +1.0)/2.0, 1.0)'),
-                    ('blue/red-anticross',  'vec4(((colorRE.r*2.0-1.0) - crossTalk.y*(colorLE.b*2.0-1.0) +1.0)/2.0, 0.0, ((colorLE.b*2.0-1.0) - crossTalk.x*(colorRE.r*2.0-1.0) +1.0)/2.0, 1.0)'),
-                 ]:
-    fragAnaglyph_src[mode] = f'''
-        varying vec2 TexCoords;     // in
-        uniform sampler2D textureLE;
-        uniform sampler2D textureRE;
-        uniform vec2 crossTalk;
-        void main()
-        {{
-            vec4 colorLE = texture2D(textureLE, TexCoords);
-            vec4 colorRE = texture2D(textureRE, TexCoords);
-            gl_FragColor = {cmd};
-        }}
-    '''
+# Color channel (R=0, G=1, B=2) shown to (LE, RE) in each anaglyph mode
+anaglyphChannels = {
+    'red/green': (0, 1),
+    'green/red': (1, 0),
+    'red/blue':  (0, 2),
+    'blue/red':  (2, 0),
+}
+anaglyphModes = [mode+suffix for suffix in ['', '-anticross'] for mode in anaglyphChannels]
+
+
+# How each stereo mode lays out the eye buffers on the screen in `flip`
+stereoLayouts = {'none': None, 'sequential': 'sequential'}
+for mode in ['left/right', 'right/left']:
+    stereoLayouts[mode] = 'side' # Two passes, with fixation shifts
+for mode in fragSplitScreen_src:
+    stereoLayouts[mode] = 'split' # A single pass
+for mode in anaglyphModes:
+    stereoLayouts[mode] = 'anaglyph' # A single pass
+
+# (vertex shader, fragment shader, sampler2D uniforms on texture unit 0, 1) 
+# for each FBO-based stereo mode, compiled lazily by `StereoWindow._compileShaderFor`
+stereoShader_src = {}
+for mode in anaglyphModes:
+    stereoShader_src[mode] = (vertTexture_src, fragAnaglyph_src, [b"textureLE", b"textureRE"])
+for mode in fragSplitScreen_src:
+    stereoShader_src[mode] = (vertTexture_src, fragSplitScreen_src[mode], [b"textureLE", b"textureRE"])
+stereoShader_src['sequential'] = (vertTexture_src, fragTexture_src, [b"aTex"])
+for mode in ['left/right', 'right/left']:
+    stereoShader_src[mode] = (vertTexture_src, fragTexture_src, [b"aTex"])
+
+# Texture coordinates transform (scale.x, scale.y, shift.x, shift.y) for each 
+# FBO-based stereo mode, which is the whole texture by default
+texTransforms = {}
+for mode in ['left/right', 'right/left']:
+    texTransforms[mode] = (0.5, 1.0, 0.25, 0.0) # Central half in x direction
 
 
 if __name__ == '__main__':
@@ -1,10 +1,26 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
-import json, warnings
+import json, warnings, weakref
+from types import MappingProxyType
 # from pypixxlib.propixx import PROPixx
 # from pypixxlib import _libdpx
 
 
+# Default configuration for `reset_propixx` (read-only, so it cannot be 
+# modified by accident)
+_default_config = MappingProxyType({
+    'RearProjectionMode': True,
+    'CeilingMountMode': False,
+    'DlpSequencerProgram': 'RGB',
+    'VideoMode': 'C24',
+    'VideoVesaBlueline': False,
+    'VesaFreeRun': False,
+})
+
+# Modes last written by psykit for each ProPixx device: {pixx: {name: value}}
+_propixx_states = weakref.WeakKeyDictionary()
+
+
 def reset_propixx(pixx, config=None):
     '''
     Reset ProPixx to its ordinary operating modes: rear, non-ceiling, RGB, C24
@@ -18,23 +34,21 @@ def reset_propixx(pixx, config=None):
         An initialized PROPixx object, e.g., ``pixx = pypixxlib.propixx.PROPixx()``.
     config : str or dict
         If provided, reset ProPixx to the modes defined by a config file (*.json)
-        or a dict.
+        or a dict. Modes not specified keep their default values, and unknown 
+        mode names raise a ValueError.
     '''
-    # Default configuration
-    cfg = {
-        'RearProjectionMode': True,
-        'CeilingMountMode': False,
-        'DlpSequencerProgram': 'RGB',
-        'VideoMode': 'C24',
-        'VideoVesaBlueline': False,
-        'VesaFreeRun': False,
-    }
-    # Load and update configuration from the file/dict
-    if config is not None:
-        if isinstance(config, str):
-            with open(config, 'r') as fi:
-                config = json.load(fi)
-        cfg.update(config)
+    # Load configuration from the file/dict
+    if isinstance(config, str):
+        with open(config, 'r') as fi:
+            config = json.load(fi)
+    if config is None:
+        config = {}
+    # Reject misspelled modes, which would otherwise be silently ignored
+    unknown = [name for name in config if name not in _default_config]
+    if unknown:
+        raise ValueError(f"Unknown ProPixx config {unknown}. Valid names are {list(_default_config)}.")
+    # Override the default configuration
+    cfg = {**_default_config, **config}
     # Image orientation
     pixx.setRearProjectionMode(cfg['RearProjectionMode']) # Set rear-projection mode (flip-left-right; instant)
     pixx.setCeilingMountMode(cfg['CeilingMountMode']) # Set ceiling-mount mode (flip-up-down; instant)
@@ -47,9 +61,32 @@ def reset_propixx(pixx, config=None):
     pixx.setVesaFreeRun(cfg['VesaFreeRun']) # Disable polarizer switching (VESA port output) in free run mode (non-sync; cached)
     # Apply cached changes
     pixx.updateRegisterCache() # Update the new modes to the device (apply cached changes)
+    # Remember what has been written, so `set_polarizer_mode` can skip no-op writes
+    _propixx_states[pixx] = dict(cfg)
     # pixx.setCustomStartupConfig() # The projector will remember this configuration
     
 
+def _set_propixx(pixx, **cfg):
+    '''
+    Set ProPixx modes by name (e.g., ``DlpSequencerProgram='RGB'`` will call
+    ``pixx.setDlpSequencerProgram('RGB')``), skipping modes that psykit has 
+    already set to the same value, and apply cached changes only if anything 
+    has been changed.
+
+    Changes made to the device outside psykit are not tracked. Call 
+    `reset_propixx` first to bring the device to a known state.
+    '''
+    state = _propixx_states.setdefault(pixx, {})
+    dirty = False
+    for name, value in cfg.items():
+        if name not in state or state[name] != value:
+            getattr(pixx, 'set'+name)(value)
+            state[name] = value
+            dirty = True
+    if dirty:
+        pixx.updateRegisterCache() # Apply cached changes
+
+
 def set_polarizer_mode(win, pixx, mode):
     '''
     Config the StereoWindow and DepthQ polarizer to realize specific stereo mode.
@@ -95,10 +132,8 @@ def set_polarizer_mode(win, pixx, mode):
     '''
     if mode == 'none':
         win.stereoMode = 'none'
-        pixx.setDlpSequencerProgram('RGB')
-        pixx.setVideoVesaBlueline(False)
-        pixx.setVesaFreeRun(False)
-        pixx.updateRegisterCache()
+        _set_propixx(pixx, DlpSequencerProgram='RGB', 
+            VideoVesaBlueline=False, VesaFreeRun=False)
     elif mode == 'blueline':
         # https://docs.vpixx.com/python/a-simple-hello-world-in-stereo
         # Pros
@@ -107,19 +142,15 @@ def set_polarizer_mode(win, pixx, mode):
         # - This mode is susceptible to frame drops
         # - Only support binocuar 60 Hz frame rate
         win.stereoMode = 'sequential'
-        pixx.setDlpSequencerProgram('RGB')
-        pixx.setVideoVesaBlueline(True)
-        pixx.setVesaFreeRun(False) # This will auto set VidVesaWaveform=PPX_DEPTHQ and VidVesaPhase=0
-        pixx.updateRegisterCache()
+        _set_propixx(pixx, DlpSequencerProgram='RGB', 
+            VideoVesaBlueline=True, VesaFreeRun=False) # This will auto set VidVesaWaveform=PPX_DEPTHQ and VidVesaPhase=0
     elif mode == 'freerun':
         # This is not really useable. Listed here only for completeness.
         # The image in the two eyes will randomly swap from time to time due to 
         # slow drift or frame drops.
         win.stereoMode = 'sequential'
-        pixx.setDlpSequencerProgram('RGB')
-        pixx.setVideoVesaBlueline(False)
-        pixx.setVesaFreeRun(True)
-        pixx.updateRegisterCache()
+        _set_propixx(pixx, DlpSequencerProgram='RGB', 
+            VideoVesaBlueline=False, VesaFreeRun=True)
     elif mode == 'RB3D':
         # Pros
         # - Robust to frame drops
@@ -127,10 +158,8 @@ def set_polarizer_mode(win, pixx, mode):
         # Cons
         # - Can only display achromatic stimuli (do not support color stimuli)
         win.stereoMode = 'red/blue-anticross'
-        pixx.setDlpSequencerProgram('RB3D')
-        pixx.setVideoVesaBlueline(False)
-        pixx.setVesaFreeRun(False)
-        pixx.updateRegisterCache()
+        _set_propixx(pixx, DlpSequencerProgram='RB3D', 
+            VideoVesaBlueline=False, VesaFreeRun=False)
     elif mode == 'double-height':
         # This is the recommended mode for most purposes.
         # Use VPutil to adjust EDID to double-height mode [1920x2160 @ 60 Hz]
@@ -146,8 +175,8 @@ def set_polarizer_mode(win, pixx, mode):
         if not win.size[1] > win.size[0]:
             raise ValueError(f"The ProPixx controller is not set to double-height mode [1920x2160 @ 60 Hz]. Please adjust EDID using VPutil and restart ProPixx controller.")
         win.stereoMode = 'top/bottom-anticross'
-        pixx.setDlpSequencerProgram('RGB')
-        pixx.setVideoVesaBlueline(False)
-        pixx.setVesaFreeRun(False)
-        pixx.updateRegisterCache()
+        _set_propixx(pixx, DlpSequencerProgram='RGB', 
+            VideoVesaBlueline=False, VesaFreeRun=False)
+    else:
+        raise ValueError(f"Unknown polarizer mode '{mode}'. Valid modes are 'none', 'blueline', 'freerun', 'RB3D', and 'double-height'.")
 